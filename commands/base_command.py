@@ -1,5 +1,9 @@
 from abc import ABC, abstractmethod
-from typing import Callable, TYPE_CHECKING
+from collections import deque
+from typing import Callable, List, TYPE_CHECKING
+import subprocess
+import threading
+import constants
 
 # Импортируем ProcessingContext только для проверки типов, чтобы избежать циклического импорта
 if TYPE_CHECKING:
@@ -8,6 +12,61 @@ if TYPE_CHECKING:
 # Определяем тип для логгера для ясности
 LoggerCallable = Callable[[str], None]
 
+# Пометки, которыми yt-dlp начинает ошибки и предупреждения в stderr, и уровни для таких строк в логе
+TOOL_STDERR_LEVELS = (("ERROR:", "[ERROR]"), ("WARNING:", "[WARN]"))
+
+
+def run_tool(cmd: List[str], logger: LoggerCallable, capture_stdout: bool = False,
+             log_prefix: str = "[DEBUG]") -> str:
+    """
+    Запускает внешний инструмент, передавая его stderr в лог построчно по мере поступления.
+
+    В памяти сохраняются только последние constants.TOOL_STDERR_TAIL_LINES строк stderr,
+    они же попадают в CalledProcessError.stderr при ненулевом коде выхода.
+    Строки с пометками из TOOL_STDERR_LEVELS логируются с уровнем ERROR/WARN вместо log_prefix,
+    чтобы не скрываться вместе с DEBUG.
+
+    Args:
+        cmd: Команда и её аргументы.
+        logger: Функция для логирования строк stderr.
+        capture_stdout: Если True, stdout собирается и возвращается; иначе отбрасывается.
+        log_prefix: Префикс для остальных строк stderr в логе; тег [DEBUG] в нём заменяется уровнем строки.
+
+    Returns:
+        Содержимое stdout (пустая строка, если capture_stdout=False).
+
+    Raises:
+        subprocess.CalledProcessError: если инструмент завершился с ненулевым кодом.
+    """
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE if capture_stdout else subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True, encoding='utf-8', errors='replace',
+    )
+    tail: deque[str] = deque(maxlen=constants.TOOL_STDERR_TAIL_LINES)
+    level_prefixes = tuple((mark, log_prefix.replace("[DEBUG]", level)) for mark, level in TOOL_STDERR_LEVELS)
+
+    def drain_stderr() -> None:
+        for line in proc.stderr:
+            line = line.rstrip()
+            if line:
+                tail.append(line)
+                prefix = next((p for mark, p in level_prefixes if line.startswith(mark)), log_prefix)
+                logger(f"{prefix} {line}")
+
+    # stderr читается в отдельном потоке, чтобы stdout-пайп не переполнился и не заблокировал процесс
+    drainer = threading.Thread(target=drain_stderr, daemon=True)
+    drainer.start()
+    stdout = proc.stdout.read() if capture_stdout else ''
+    returncode = proc.wait()
+    drainer.join()
+
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd, output=stdout, stderr='\n'.join(tail))
+    return stdout
+
+
 class ActionCommand(ABC):
     """Абстрактный базовый класс для всех команд действий."""
 
@@ -20,6 +79,10 @@ class ActionCommand(ABC):
         """
         self.log: LoggerCallable = logger
 
+    def run_tool(self, cmd: List[str], capture_stdout: bool = False) -> str:
+        """Запускает внешний инструмент с потоковым логированием stderr (см. run_tool)."""
+        return run_tool(cmd, self.log, capture_stdout=capture_stdout)
+
     @abstractmethod
     def execute(self, context: 'ProcessingContext') -> None:
         """
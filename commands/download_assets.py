@@ -0,0 +1,170 @@
+# File: commands/download_assets.py
+
+from commands.base_command import LoggerCallable
+from commands.download_metadata import DownloadMetadata
+from commands.download_thumbnail import DownloadThumbnail
+from model.processing_context import ProcessingContext
+from utils.utils import ensure_dir
+import subprocess
+import json
+import uuid
+from pathlib import Path
+from typing import Set
+
+class DownloadAssets(DownloadMetadata):
+    """
+    Команда для скачивания метаданных вместе с субтитрами, превью и/или видео одним вызовом yt-dlp.
+    Используется VideoService вместо DownloadMetadata, если выбраны действия 'ds', 'tp' или 'dv'.
+    """
+
+    def __init__(self, logger: LoggerCallable, subtitles: bool, thumbnail: bool, video: bool = False):
+        super().__init__(logger)
+        # Флаги сбрасываются для ассетов, которые нельзя скачать совмещённым вызовом,
+        # и для уже существующих файлов: их проверяют отдельные команды (кеш повторных запусков)
+        self.subtitles = subtitles
+        self.thumbnail = thumbnail
+        self.video = video
+        # True, если совмещённый вызов выполнен и отдельные команды для оставшихся флагов не нужны
+        self.fetched: bool = False
+        # Файлы output_dir до совмещённого вызова: base ещё неизвестен, поэтому целевой путь видео
+        # проверяется после вызова по этому снимку
+        self._existing_before: Set[Path] = set()
+
+    def execute(self, context: ProcessingContext) -> None:
+        """
+        Скачивает метаданные и выбранные ассеты, заполняет context.base, subtitle_path, thumbnail_path, video_path.
+        При ошибке совмещённого вызова откатывается к обычной загрузке метаданных.
+        """
+        output_dir: Path = context.output_dir
+        ensure_dir(output_dir)
+
+        lang = context.subtitle_lang
+        fmt = context.subtitle_format
+        # Без нужных настроек отдельная команда выдаст понятную ошибку
+        if self.subtitles and not (lang and fmt):
+            self.log("[DEBUG] Язык или формат субтитров не задан, субтитры будут обработаны отдельно.")
+            self.subtitles = False
+        if self.video and not (context.yt_dlp_format and context.video_format_ext):
+            self.log("[DEBUG] Формат видео не задан, видео будет обработано отдельно.")
+            self.video = False
+
+        yt_dlp_path = context.get_tool_path('yt-dlp')
+        # yt-dlp сохраняет файлы под временным префиксом: base станет известен только из метаданных
+        prefix = f".assets-{uuid.uuid4().hex[:8]}"
+        temp_template = str(output_dir / f"{prefix}.%(ext)s")
+        cmd = [str(yt_dlp_path), '--no-playlist', '--write-info-json']
+        if self.video:
+            # Видео сохраняется под своим id, чтобы yt-dlp пропускал уже скачанный файл при повторном запуске
+            cmd += [
+                '--format', context.yt_dlp_format,
+                '--merge-output-format', context.video_format_ext,
+                '-o', str(output_dir / "%(id)s.%(ext)s"),
+                '-o', f"infojson:{temp_template}",
+                '-o', f"subtitle:{temp_template}",
+                '-o', f"thumbnail:{temp_template}",
+            ]
+        else:
+            cmd += ['--skip-download', '-o', temp_template]
+        if self.subtitles:
+            cmd += ['--write-sub', '--sub-lang', lang, '--convert-subs', fmt]
+        if self.thumbnail:
+            cmd.append('--write-thumbnail')
+        cmd.append(context.url)
+
+        assets = []
+        if self.subtitles:
+            assets.append('субтитрами')
+        if self.thumbnail:
+            assets.append('превью')
+        if self.video:
+            assets.append('видео')
+        if not assets:
+            super().execute(context)
+            return
+        self.log(f"[INFO] Запрос метаданных вместе с {' и '.join(assets)}...")
+        if self.video:
+            self._existing_before = context.existing_outputs()
+        try:
+            self.run_tool(cmd)
+            with open(output_dir / f"{prefix}.info.json", encoding='utf-8') as f:
+                data = json.load(f)
+        except (subprocess.CalledProcessError, OSError, json.JSONDecodeError) as e:
+            self.log(f"[WARN] Совмещённая загрузка не удалась ({type(e).__name__}), метаданные будут запрошены отдельно.")
+            self._cleanup(output_dir, prefix)
+            super().execute(context)
+            return
+
+        try:
+            self.apply_metadata(context, data)
+            if self.subtitles:
+                self._place_subtitles(context, prefix)
+            if self.thumbnail:
+                self._place_thumbnail(context, prefix)
+            if self.video:
+                self._place_video(context, data)
+            self.fetched = True
+        finally:
+            self._cleanup(output_dir, prefix)
+
+    def _claim(self, temp: Path, target: Path) -> bool:
+        """
+        Переносит временный файл на целевой путь.
+        Существующий файл не перезаписывается: тогда возвращает False.
+        """
+        if temp == target:
+            return True
+        if target.exists():
+            self.log(f"[DEBUG] Файл уже существует, он будет проверен отдельной командой: {target}")
+            return False
+        temp.replace(target)
+        return True
+
+    def _place_subtitles(self, context: ProcessingContext, prefix: str) -> None:
+        lang = context.subtitle_lang
+        temp = context.output_dir / f"{prefix}.{lang}.{context.subtitle_format}"
+        target: Path = context.get_subtitle_filepath(lang)  # type: ignore
+        if temp.exists() and self._claim(temp, target):
+            context.subtitle_path = target
+            self.log(f"[INFO] Субтитры сохранены: {target}")
+        elif target.exists():
+            self.subtitles = False
+        else:
+            self.log(f"[WARN] Субтитры для языка '{lang}' недоступны.")
+
+    def _place_thumbnail(self, context: ProcessingContext, prefix: str) -> None:
+        for ext in DownloadThumbnail.THUMBNAIL_EXTENSIONS:
+            temp = context.output_dir / f"{prefix}{ext}"
+            if temp.exists():
+                target = context.output_dir / f"{context.base}{ext}"
+                if self._claim(temp, target):
+                    context.thumbnail_path = target
+                    self.log(f"[INFO] Превью сохранено: {target}")
+                else:
+                    self.thumbnail = False
+                return
+        self.log("[WARN] Превью недоступно для данного видео.")
+
+    def _place_video(self, context: ProcessingContext, data: dict) -> None:
+        downloaded = context.output_dir / f"{data.get('id', '')}.{context.video_format_ext}"
+        target: Path = context.get_video_filepath()  # type: ignore
+        if downloaded in self._existing_before or target in self._existing_before:
+            # yt-dlp не перекачивает уже скачанный файл: его проверяет отдельная команда (кеш повторных запусков)
+            self.log(f"[DEBUG] Видео уже существовало до загрузки, оно будет проверено отдельной командой: {target}")
+            self.video = False
+            return
+        if downloaded.exists() and self._claim(downloaded, target):
+            context.video_path = target
+            self.log(f"[INFO] Видео сохранено: {target}")
+        elif target.exists():
+            self.video = False
+        else:
+            self.log(f"[ERROR] Ожидаемый видеофайл не найден: {downloaded}")
+            raise FileNotFoundError(f"Видео не найдено после загрузки: {downloaded}")
+
+    def _cleanup(self, output_dir: Path, prefix: str) -> None:
+        """Удаляет оставшиеся временные файлы (info.json, невостребованные ассеты)."""
+        for leftover in output_dir.glob(f"{prefix}*"):
+            try:
+                leftover.unlink()
+            except OSError as e:
+                self.log(f"[WARN] Не удалось удалить временный файл {leftover}: {e}")
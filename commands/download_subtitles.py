@@ -2,7 +2,7 @@
 
 from commands.base_command import ActionCommand
 from model.processing_context import ProcessingContext
-from utils.utils import ensure_dir, get_tool_path
+from utils.utils import ensure_dir, find_file_by_prefix
 import subprocess
 from pathlib import Path
 
@@ -33,7 +33,7 @@ class DownloadSubtitles(ActionCommand):
             context.subtitle_path = expected_path
             return
 
-        yt_dlp = get_tool_path('yt-dlp')
+        yt_dlp = context.get_tool_path('yt-dlp')
         self.log(f"[INFO] Скачивание субтитров ({lang}, {fmt})...")
 
         cmd = [
@@ -48,7 +48,7 @@ class DownloadSubtitles(ActionCommand):
         ]
 
         try:
-            proc = subprocess.run(cmd, check=True, capture_output=True, text=True)
+            self.run_tool(cmd)
         except subprocess.CalledProcessError as e:
             stderr = e.stderr or ''
             if 'unable to download subtitle' in stderr.lower() or 'no subtitles found' in stderr.lower():
@@ -64,9 +64,8 @@ class DownloadSubtitles(ActionCommand):
             return
 
         # Альтернативный поиск по шаблону
-        matched = list(output_dir.glob(f"{context.base}*.{fmt}"))
-        if matched:
-            result = matched[0]
+        result = find_file_by_prefix(context.base, f".{fmt}", output_dir)
+        if result:
             # Попытка переименования
             if expected_path:
                 result.rename(expected_path)
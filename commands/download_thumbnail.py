@@ -2,13 +2,16 @@
 
 from commands.base_command import ActionCommand
 from model.processing_context import ProcessingContext
-from utils.utils import ensure_dir, get_tool_path
+from utils.utils import ensure_dir
 import subprocess
 from pathlib import Path
 
 class DownloadThumbnail(ActionCommand):  # наследуем от ActionCommand
     """Команда для скачивания превью видео с использованием yt-dlp."""
 
+    # Расширения, в которых yt-dlp может сохранить превью
+    THUMBNAIL_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
     def execute(self, context: ProcessingContext) -> None:
         """
         Скачивает файл превью (thumbnail) для видео.
@@ -20,14 +23,15 @@ class DownloadThumbnail(ActionCommand):  # наследуем от ActionCommand
         output_dir: Path = context.output_dir
         ensure_dir(output_dir)
 
-        ytdlp = get_tool_path('yt-dlp')
-        expected_default: Path = context.get_thumbnail_filepath()  # type: ignore
+        ytdlp = context.get_tool_path('yt-dlp')
 
         # Если уже скачано с одним из популярных расширений
-        if expected_default and expected_default.exists():
-            context.thumbnail_path = expected_default
-            self.log(f"[WARN] Превью уже существует: {expected_default}")
-            return
+        for ext in self.THUMBNAIL_EXTENSIONS:
+            existing = output_dir / f"{context.base}{ext}"
+            if existing.exists():
+                context.thumbnail_path = existing
+                self.log(f"[WARN] Превью уже существует: {existing}")
+                return
 
         # Команда yt-dlp для скачивания превью
         cmd = [
@@ -35,13 +39,13 @@ class DownloadThumbnail(ActionCommand):  # наследуем от ActionCommand
             '--no-playlist',
             '--skip-download',
             '--write-thumbnail',
-            '--paths', str(output_dir),
+            '-o', str(output_dir / f"{context.base}.%(ext)s"),
             context.url
         ]
         self.log("[INFO] Скачивание превью видео...")
 
         try:
-            proc = subprocess.run(cmd, check=True, capture_output=True, text=True)
+            self.run_tool(cmd)
         except subprocess.CalledProcessError as e:
             stderr = e.stderr or ''
             if 'no thumbnails found' in stderr.lower() or 'unable to download thumbnail' in stderr.lower():
@@ -51,7 +55,7 @@ class DownloadThumbnail(ActionCommand):  # наследуем от ActionCommand
             raise
 
         # Пытаемся найти файл в output_dir
-        for ext in ['.jpg', '.jpeg', '.png', '.webp']:
+        for ext in self.THUMBNAIL_EXTENSIONS:
             candidate = output_dir / f"{context.base}{ext}"
             if candidate.exists():
                 context.thumbnail_path = candidate
@@ -61,7 +65,7 @@ class DownloadThumbnail(ActionCommand):  # наследуем от ActionCommand
         # Альтернативный поиск по любому расширению
         matches = list(output_dir.glob(f"{context.base}.*"))
         for m in matches:
-            if m.is_file() and m.suffix.lower() in ['.jpg', '.jpeg', '.png', '.webp']:
+            if m.is_file() and m.suffix.lower() in self.THUMBNAIL_EXTENSIONS:
                 context.thumbnail_path = m
                 self.log(f"[INFO] Превью найдено как {m.name}")
                 return
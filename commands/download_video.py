@@ -2,7 +2,7 @@
 
 from commands.base_command import ActionCommand
 from model.processing_context import ProcessingContext
-from utils.utils import ensure_dir, get_tool_path
+from utils.utils import ensure_dir
 import subprocess
 from pathlib import Path
 
@@ -33,7 +33,7 @@ class DownloadVideo(ActionCommand):
             context.video_path = expected
             return
 
-        ytdlp = get_tool_path('yt-dlp')
+        ytdlp = context.get_tool_path('yt-dlp')
         template = output_dir / f"{context.base}.%(ext)s"
         self.log(f"[INFO] Скачивание видео (формат: '{fmt}', контейнер: '{ext}')...")
 
@@ -47,7 +47,7 @@ class DownloadVideo(ActionCommand):
         ]
 
         try:
-            proc = subprocess.run(cmd, check=True, capture_output=True, text=True)
+            self.run_tool(cmd)
         except subprocess.CalledProcessError as e:
             stderr = e.stderr or ''
             self.log(f"[ERROR] yt-dlp error: {stderr}")
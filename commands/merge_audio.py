@@ -2,7 +2,7 @@
 
 from commands.base_command import ActionCommand
 from model.processing_context import ProcessingContext
-from utils.utils import get_tool_path
+from utils import ffprobe
 import subprocess
 from pathlib import Path
 
@@ -40,15 +40,21 @@ class MergeAudio(ActionCommand):
             context.merged_video_path = output
             return
 
-        ffmpeg = get_tool_path('ffmpeg')
+        ffmpeg = context.get_tool_path('ffmpeg')
         self.log(f"[INFO] Слияние аудио: {video_path.name} + {yandex_path.name} => {output.name}")
 
+        # Без аудиодорожки в видео (по данным ffprobe) смешивать не с чем: используется только внешнее аудио
+        if context.probe_info is not None and not ffprobe.has_stream(context.probe_info, 'audio'):
+            self.log("[WARN] В видео нет аудиодорожки, будет использовано только внешнее аудио.")
+            audio_args = ['-filter_complex', f"[1:a]volume={vol1}[aout]", '-shortest']
+        else:
+            audio_args = ['-filter_complex', f"[0:a]volume={vol0}[a0];[1:a]volume={vol1}[a1];[a0][a1]amix=inputs=2:duration=first[aout]"]
+
         cmd = [
             str(ffmpeg), '-y',
             '-i', str(video_path),
             '-i', str(yandex_path),
-            '-filter_complex',
-            f"[0:a]volume={vol0}[a0];[1:a]volume={vol1}[a1];[a0][a1]amix=inputs=2:duration=first[aout]",
+            *audio_args,
             '-map', '0:v',
             '-map', '[aout]',
             '-c:v', 'copy',
@@ -57,7 +63,7 @@ class MergeAudio(ActionCommand):
         ]
 
         try:
-            proc = subprocess.run(cmd, check=True, capture_output=True, text=True)
+            self.run_tool(cmd)
         except subprocess.CalledProcessError as e:
             stderr = e.stderr or ''
             self.log(f"[ERROR] ffmpeg error: {stderr}")
@@ -76,5 +76,6 @@ class TranslateMetadata(ActionCommand):
 
         except Exception as e:
             self.log(f"[ERROR] Неожиданная ошибка в TranslateMetadata: {type(e).__name__} - {e}")
-            self.log(f"[DEBUG] Traceback:\n{traceback.format_exc()}")
+            if context.debug:
+                self.log(f"[DEBUG] Traceback:\n{traceback.format_exc()}")
             raise
@@ -74,5 +74,6 @@ class TranslateSubtitles(ActionCommand):
             self.log(f"[INFO] Переведённые субтитры сохранены: {out_path}")
         except Exception as e:
             self.log(f"[ERROR] Ошибка сохранения переведённых субтитров: {e}")
-            self.log(f"[DEBUG] Traceback:\n{traceback.format_exc()}")
+            if context.debug:
+                self.log(f"[DEBUG] Traceback:\n{traceback.format_exc()}")
             raise
@@ -1,6 +1,6 @@
 # File: commands/trim_media.py
 
-from commands.base_command import LoggerCallable
+from commands.base_command import LoggerCallable, run_tool
 from utils.utils import get_tool_path, is_valid_time_format
 from pathlib import Path
 import subprocess
@@ -69,9 +69,8 @@ class TrimMedia:
 
         # Запуск ffmpeg
         try:
-            proc = subprocess.run(cmd, check=True, capture_output=True, text=True)
-            # ffmpeg пишет инфо в stderr
-            self.log(f"[TRIM][DEBUG] ffmpeg stderr:\n{proc.stderr}")
+            # ffmpeg пишет инфо в stderr, оно попадает в лог построчно
+            run_tool(cmd, self.log, log_prefix="[TRIM][DEBUG]")
             if out.exists():
                 self.log(f"[TRIM][INFO] Обрезка успешна: {out}")
             else:
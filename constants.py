@@ -7,6 +7,8 @@ VIDEO_DIR_DEFAULT = "video_output" # Default directory name
 # Example: FFMPEG_PATH = "C:/ffmpeg/bin/ffmpeg.exe"
 FFMPEG_PATH: str | None = None
 YTDLP_PATH: str | None = None
+FFPROBE_PATH: str | None = None # Необязателен: без ffprobe предварительная проверка видео пропускается
+TOOL_STDERR_TAIL_LINES = 50 # Сколько последних строк stderr хранить для сообщения об ошибке
 
 # --- yt-dlp Settings ---
 # DEFAULTS - These will be configurable via GUI
@@ -34,8 +36,20 @@ ORIGINAL_VOLUME_DEFAULT = "0.0" # Default original audio volume (0.0 = mute, 1.0
 ADDED_VOLUME_DEFAULT = "1.0"  # Default added (Yandex) audio volume
 MERGED_AUDIO_CODEC_DEFAULT = "aac" # Output audio codec after merging
 
+# --- Metadata Cache ---
+METADATA_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "video-downloader") # Кеш метаданных yt-dlp по URL
+METADATA_CACHE_MAX_AGE_S = 3600 # Срок годности записи кеша (секунды)
+
+# --- Parallel Processing ---
+BATCH_MAX_WORKERS_DEFAULT = 4 # Максимум параллельных процессов при пакетной обработке URL
+MAX_PARALLEL_ACTIONS = 3 # Максимум одновременно выполняемых действий для одного URL
+
 # --- GUI ---
-QUEUE_POLL_INTERVAL_MS = 100 # Check ViewModel queue interval (milliseconds)
+QUEUE_POLL_MIN_MS = 10 # Интервал опроса очереди ViewModel сразу после активности (миллисекунды)
+QUEUE_POLL_MAX_MS = 200 # Максимальный интервал опроса очереди, пока выполняется задача (миллисекунды)
+LOG_PROGRESS_INTERVAL_S = 0.1 # Не чаще одной строки прогресса yt-dlp/ffmpeg за этот интервал (секунды)
+MAX_MESSAGES_PER_DRAIN = 500 # Сколько сообщений ViewModel разбирать за один проход, чтобы GUI успевал обрабатывать ввод
+MAX_QUEUED_LOG_MESSAGES = 5000 # При стольких неразобранных сообщениях строки лога ниже WARN отбрасываются
 
 # --- Trimming ---
 # Можно добавить константы по умолчанию для времени обрезки, если нужно
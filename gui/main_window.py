@@ -1,19 +1,16 @@
 # File: gui/main_window.py
 
 import tkinter as tk
-from tkinter import ttk, messagebox, Menu, filedialog
-import threading
-import os
-import traceback
-from pathlib import Path
-from typing import Any, Dict
+from tkinter import ttk, messagebox, Menu
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
 from .process_tab import ProcessTab
 from .settings_tab import SettingsTab
 from .trim_tab import TrimTab
-from viewmodel.video_viewmodel import VideoViewModel
+from viewmodel.video_viewmodel import VideoViewModel, VMMessage
 import constants
-from utils.utils import find_executable, is_valid_time_format
+from utils.utils import is_valid_time_format
+from utils.metadata_cache import clear_metadata_cache
 
 class MainApplication:
     """
@@ -23,10 +20,38 @@ class MainApplication:
     - Иконки в вкладках
     - Статус-бар
     """
+    # Приоритет уровней лога: сообщения ниже порога отбрасываются до вставки в Text
+    LOG_LEVEL_PRIORITY = {'DEBUG': 10, 'INFO': 20, 'TRIM': 20, 'WARN': 30, 'ERROR': 40}
+    # Источники задач, на время которых поля ввода и кнопки запуска отключаются
+    JOB_ORIGINS = frozenset(('url', 'trim'))
+
     def __init__(self, root: tk.Tk, view_model: VideoViewModel):
         self.root = root
         self.vm = view_model
-        self.vm.add_listener(self._handle_vm_notification)
+        # Текущий интервал опроса очереди ViewModel: растёт в простое, сбрасывается при новых сообщениях
+        self._vm_poll_delay_ms = constants.QUEUE_POLL_MIN_MS
+        self._vm_poll_id: Optional[str] = None
+        # Источники ('url', 'trim', 'app' — проверка утилит), задачи которых сейчас выполняются.
+        # Когда их нет, очередь не опрашивается до следующего _wake_vm_poll.
+        self._vm_active_origins: Set[str] = {'app'}
+        # Число скрытых DEBUG-сообщений с начала текущей задачи (показывается в статусе по её завершении)
+        self._dropped_debug_count = 0
+        # Обработчики сообщений ViewModel по типу и состояние текущего разбора очереди
+        self._msg_handlers: Dict[str, Callable[[VMMessage], None]] = {
+            'log': self._on_vm_log,
+            'status': self._on_vm_status,
+            'tools': self._on_vm_tools,
+            'validation_error': self._on_vm_validation_error,
+        }
+        self._drain_batch: List[Tuple[str, str]] = []
+        self._drain_status: Optional[str] = None
+        self._drain_validation_errors: List[Tuple[str, List[str]]] = []
+        self._drain_min_priority = 0
+        # True после закрытия окна: очередь ViewModel больше не опрашивается
+        self._closed = False
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+        # Флаг выставляется и при уничтожении окна в обход _on_close (root.destroy(), завершение Tcl)
+        self.root.bind("<Destroy>", self._on_destroy, add="+")
 
         # --- Настройка окна ---
         self.root.title("ВидеоОбработчик v1.2")
@@ -61,10 +86,14 @@ class MainApplication:
         # --- Привязка кнопок ---
         self.process_tab.start_btn.config(command=self._on_start_url_processing)
         self.process_tab.clear_log_btn.config(command=self._clear_log)
+        self.process_tab.show_debug_cb.config(command=self._on_show_debug_toggled)
         self.trim_tab.trim_btn.config(command=self._on_start_trim)
 
-        # Проверка внешних утилит после загрузки UI
-        self.root.after(100, self._check_external_tools)
+        # Проверка внешних утилит в фоне; найденные find_executable пути кешируются
+        # и переиспользуются VideoService при проверке инструментов
+        self.vm.check_external_tools()
+        # Разбор очереди ViewModel выполняется только в главном потоке
+        self._schedule_vm_poll(None)
 
     def _center_window(self, width: int, height: int) -> None:
         ws, hs = self.root.winfo_screenwidth(), self.root.winfo_screenheight()
@@ -75,7 +104,9 @@ class MainApplication:
     def _create_menu(self) -> None:
         menubar = Menu(self.root)
         file_menu = Menu(menubar, tearoff=0)
-        file_menu.add_command(label='Выход', command=self.root.quit)
+        file_menu.add_command(label='Очистить кеш метаданных', command=self._clear_metadata_cache)
+        file_menu.add_separator()
+        file_menu.add_command(label='Выход', command=self._on_close)
         menubar.add_cascade(label='Файл', menu=file_menu)
 
         help_menu = Menu(menubar, tearoff=0)
@@ -85,20 +116,24 @@ class MainApplication:
 
         self.root.config(menu=menubar)
 
+    def _on_close(self) -> None:
+        self._closed = True
+        self.root.destroy()
+
+    def _on_destroy(self, event: tk.Event) -> None:
+        # Привязка к root срабатывает и для всех дочерних виджетов
+        if event.widget is self.root:
+            self._closed = True
+
     def _show_about(self) -> None:
         messagebox.showinfo('О программе', 'ВидеоОбработчик v1.2\nРазработано mcniki')
 
     def _open_docs(self) -> None:
         messagebox.showinfo('Документация', 'Документация находится в папке docs в корне проекта.')
 
-    def _check_external_tools(self) -> None:
-        missing = []
-        for tool, display in [('yt-dlp','yt-dlp'), ('ffmpeg','FFmpeg')]:
-            if not find_executable(tool, getattr(constants, f"{tool.upper()}_PATH")): missing.append(display)
-        if missing:
-            self._set_status('⚠️ Не найдены: ' + ', '.join(missing))
-        else:
-            self._set_status('✔️ Все утилиты доступны')
+    def _clear_metadata_cache(self) -> None:
+        removed = clear_metadata_cache()
+        self._set_status(f'Кеш метаданных очищен (записей: {removed})')
 
     def _set_status(self, text: str) -> None:
         self.status_var.set(text)
@@ -107,6 +142,12 @@ class MainApplication:
         self.process_tab.add_log_message(message, level)
         self._set_status(f"{level}: {message}")
 
+    def _on_show_debug_toggled(self) -> None:
+        show = self.process_tab.show_debug_var.get()
+        self.process_tab.show_debug = show
+        # Отключённые DEBUG-сообщения отбрасываются уже во ViewModel, до очереди
+        self.vm.set_debug(show)
+
     def _clear_log(self) -> None:
         self.process_tab.clear_log()
         self._set_status('Лог очищен')
@@ -115,6 +156,7 @@ class MainApplication:
         self._set_status('Запуск обработки URL...')
         self._add_log_message('>>> Запуск обработки URL', 'INFO')
         self._run_url_flow()
+        self._wake_vm_poll()
 
     def _run_url_flow(self) -> None:
         url = self.process_tab.get_url()
@@ -142,6 +184,7 @@ class MainApplication:
         self._set_status('Запуск обрезки...')
         self._add_log_message('>>> Запуск обрезки', 'TRIM')
         self._run_trim_flow()
+        self._wake_vm_poll()
 
     def _run_trim_flow(self) -> None:
         inp = self.trim_tab.get_input_path()
@@ -150,7 +193,7 @@ class MainApplication:
         et = self.trim_tab.get_end_time()
 
         errors = []
-        if not inp or not os.path.isfile(inp): errors.append('Неверный входной файл')
+        if not inp: errors.append('Не указан входной файл')
         if not outp: errors.append('Не указан выходной файл')
         if not is_valid_time_format(st) or not is_valid_time_format(et): errors.append('Неверный формат времени')
         if errors:
@@ -164,29 +207,101 @@ class MainApplication:
             messagebox.showerror('Критическая ошибка', str(e))
             self._set_status('Ошибка обрезки')
 
-    def _handle_vm_notification(self, msg: Dict[str, Any]) -> None:
-        # Всегда вызывается в основном потоке через after
-        if not hasattr(self, 'root') or not self.root.winfo_exists(): return
-        self.root.after(0, self._process_vm_queue)
+    def _schedule_vm_poll(self, delay_ms: Optional[int]) -> None:
+        """Планирует разбор очереди ViewModel через delay_ms (None — при ближайшем простое), отменяя уже запланированный."""
+        if self._vm_poll_id is not None:
+            self.root.after_cancel(self._vm_poll_id)
+        if delay_ms is None:
+            self._vm_poll_id = self.root.after_idle(self._process_vm_queue)
+        else:
+            self._vm_poll_id = self.root.after(delay_ms, self._process_vm_queue)
+
+    def _wake_vm_poll(self) -> None:
+        """Возобновляет опрос после запуска задачи со сброшенным интервалом, чтобы первые сообщения появились сразу."""
+        if self._closed: return
+        self._vm_poll_delay_ms = constants.QUEUE_POLL_MIN_MS
+        self._schedule_vm_poll(None)
 
     def _process_vm_queue(self) -> None:
-        while True:
-            try:
-                msg = self.vm.get_message_from_queue()
-            except Exception:
-                break
-            if not msg: break
-
-            mtype = msg.get('type')
-            level = msg.get('level', 'INFO')
-            data = msg.get('data')
-            origin = msg.get('origin','url')
-
-            if mtype == 'log':
-                self._add_log_message(str(data), level)
-            elif mtype == 'status':
-                status = 'Успех' if data=='finished' else 'Ошибка'
-                self._set_status(f"{origin}: {status}")
+        """
+        Забирает все накопившиеся сообщения ViewModel и выводит логи одной вставкой.
+        Перепланирует себя: сразу (after_idle), если пришли новые сообщения, иначе с растущим интервалом;
+        когда ни одна задача не выполняется, опрос останавливается до _wake_vm_poll.
+        """
+        self._vm_poll_id = None
+        if self._closed: return
+        self._drain_batch = []
+        self._drain_status = None
+        self._drain_validation_errors = []
+        self._drain_min_priority = self.LOG_LEVEL_PRIORITY['DEBUG' if self.process_tab.show_debug else 'INFO']
+        handlers = self._msg_handlers
+        # Ограниченная пачка: остаток разбирается при следующем простое, между пачками Tk обрабатывает ввод
+        for msg in self.vm.drain_queue(constants.MAX_MESSAGES_PER_DRAIN):
+            handler = handlers.get(msg.type)
+            if handler is not None:
+                handler(msg)
+
+        batch = self._drain_batch
+        if batch:
+            self.process_tab.add_log_messages(batch)
+            # Статус показывает последнее сообщение пачки: строка форматируется один раз, а не на каждое сообщение
+            if self._drain_status is None:
+                self._drain_status = "{1}: {0}".format(*batch[-1])
+        if self._drain_status is not None:
+            self._set_status(self._drain_status)
+        for origin, errors in self._drain_validation_errors:
+            title = 'Ошибка ввода (Обрезка)' if origin == 'trim' else 'Ошибка ввода'
+            messagebox.showerror(title, '\n'.join(errors))
+
+        if self.vm.message_event.is_set():
+            self._vm_poll_delay_ms = constants.QUEUE_POLL_MIN_MS
+            self._schedule_vm_poll(None)
+        else:
+            if batch or self._drain_status is not None:
+                self._vm_poll_delay_ms = constants.QUEUE_POLL_MIN_MS
+            if not self._vm_active_origins:
+                # Задач нет — новых сообщений не будет, пока GUI сам не запустит задачу
+                return
+            self._schedule_vm_poll(self._vm_poll_delay_ms)
+            self._vm_poll_delay_ms = min(self._vm_poll_delay_ms * 2, constants.QUEUE_POLL_MAX_MS)
+
+    # --- Обработчики сообщений ViewModel (вызываются из _process_vm_queue по типу сообщения) ---
+
+    def _on_vm_log(self, msg: VMMessage) -> None:
+        level = msg.level
+        if self.LOG_LEVEL_PRIORITY.get(level, 20) < self._drain_min_priority:
+            self._dropped_debug_count += 1
+            return
+        self._drain_batch.append((str(msg.data), level))
+        # Статус из более раннего сообщения перекрывается этой строкой лога
+        self._drain_status = None
+
+    def _on_vm_status(self, msg: VMMessage) -> None:
+        data, origin = msg.data, msg.origin
+        if data == 'running':
+            self._vm_active_origins.add(origin)
+            self._dropped_debug_count = 0
+        else:
+            self._vm_active_origins.discard(origin)
+        self._set_inputs_enabled(not self._vm_active_origins & self.JOB_ORIGINS)
+        status = 'Успех' if data=='finished' else 'Ошибка'
+        self._drain_status = f"{origin}: {status}"
+        # Скрытые DEBUG-сообщения: отброшенные ViewModel и уже стоявшие в очереди при отключении флажка
+        hidden = self._dropped_debug_count + msg.hidden_debug
+        if data != 'running' and hidden:
+            self._drain_status += f" (скрыто DEBUG-сообщений: {hidden})"
+
+    def _set_inputs_enabled(self, enabled: bool) -> None:
+        for tab in (self.process_tab, self.trim_tab, self.settings_tab):
+            tab.set_enabled(enabled)
+
+    def _on_vm_tools(self, msg: VMMessage) -> None:
+        missing = msg.data
+        self._vm_active_origins.discard(msg.origin)
+        self._drain_status = ('⚠️ Не найдены: ' + ', '.join(missing)) if missing else '✔️ Все утилиты доступны'
+
+    def _on_vm_validation_error(self, msg: VMMessage) -> None:
+        self._drain_validation_errors.append((msg.origin, list(msg.data)))
 
 def create_gui():
     """Создает корневое окно Tkinter, ViewModel, GUI и запускает главный цикл."""
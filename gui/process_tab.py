@@ -1,8 +1,8 @@
 # File: gui/process_tab.py
 
 import tkinter as tk
-from tkinter import ttk, filedialog
-from typing import Dict, List, Optional
+from tkinter import ttk
+from typing import Dict, List, Optional, Set, Tuple
 import constants
 from utils.utils import ensure_dir
 
@@ -37,7 +37,7 @@ class ToolTip:
 
 class ProcessTab(ttk.Frame):
     """Вкладка обработки URL: выбор действий, логирование и управление."""
-    ACTION_DEFINITIONS = [
+    ACTION_DEFINITIONS = (
         ('tp', 'Скачать превью'),
         ('md', 'Метаданные'),
         ('dv', 'Видео'),
@@ -45,11 +45,37 @@ class ProcessTab(ttk.Frame):
         ('dt', 'Перевод субтитров'),
         ('da', 'Смешать аудио'),
         ('tm', 'Перевод метаданных'),
-    ]
+    )
+    ACTION_KEYS = tuple(key for key, _ in ACTION_DEFINITIONS)
+    # Цвета строк лога по уровню (теги Text)
+    LOG_LEVEL_COLORS = {
+        'ERROR': '#c00000',
+        'WARN': '#b36b00',
+        'DEBUG': '#808080',
+    }
+    # Тег Text для уровня лога; неизвестные уровни выводятся с тегом INFO, а не создают новые теги
+    LOG_LEVEL_TAGS = {level: level for level in ('INFO', 'WARN', 'ERROR', 'DEBUG', 'TRIM')}
+    # Ограничение размера лога: при превышении MAX_LOG_LINES удаляются LOG_TRIM_CHUNK самых старых строк сверх лимита
+    MAX_LOG_LINES = 2000
+    LOG_TRIM_CHUNK = 500
+    # Клавиши, не изменяющие текст лога: навигация и (с Control) копирование/выделение
+    LOG_NAVIGATION_KEYS = frozenset({'Left', 'Right', 'Up', 'Down', 'Home', 'End', 'Prior', 'Next'})
+    LOG_CONTROL_KEYS = frozenset({'c', 'a', 'slash', 'insert'})
+    # Автопрокрутка выполняется, только если перед вставкой лог был прокручен до конца (доля yview)
+    LOG_AUTOSCROLL_THRESHOLD = 0.999
 
     def __init__(self, parent, *args, **kwargs):
         super().__init__(parent, *args, **kwargs)
-        self.action_vars: Dict[str, tk.BooleanVar] = {}
+        self.action_vars: Dict[str, tk.BooleanVar] = {key: tk.BooleanVar(self, value=False) for key in self.ACTION_KEYS}
+        # Выбранные действия, синхронизируемые с переменными флажков при любой записи,
+        # в том числе программной .set() (без обращений к Tcl при запуске)
+        self._selected_actions: Set[str] = set()
+        for key, var in self.action_vars.items():
+            var.trace_add('write', lambda *_, k=key: self._sync_action(k))
+        # True, пока прокрутка лога в конец запланирована на ближайший простой Tk
+        self._scroll_pending = False
+        # Число строк в логе, считаемое при вставке, чтобы не запрашивать его у Tk на каждой пачке
+        self._log_line_count = 0
         self._build_ui()
 
     def _build_ui(self):
@@ -82,11 +108,11 @@ class ProcessTab(ttk.Frame):
         # Действия
         actions_frame = ttk.LabelFrame(self, text="Действия")
         actions_frame.grid(row=3, column=0, columnspan=3, sticky=tk.EW, padx=5, pady=10)
+        action_cbs = []
         for i, (key, label) in enumerate(self.ACTION_DEFINITIONS):
-            var = tk.BooleanVar(value=False)
-            cb = ttk.Checkbutton(actions_frame, text=label, variable=var)
+            cb = ttk.Checkbutton(actions_frame, text=label, variable=self.action_vars[key])
             cb.grid(row=i//4, column=i%4, padx=5, pady=3, sticky=tk.W)
-            self.action_vars[key] = var
+            action_cbs.append(cb)
 
         # Лог
         log_frame = ttk.LabelFrame(self, text="Лог")
@@ -95,7 +121,17 @@ class ProcessTab(ttk.Frame):
         log_frame.rowconfigure(0, weight=1)
         self.log_txt = tk.Text(log_frame, height=10, wrap=tk.NONE)
         self.log_txt.grid(row=0, column=0, sticky=tk.NSEW)
-        self.log_txt.configure(state=tk.DISABLED)
+        log_scroll = ttk.Scrollbar(log_frame, orient=tk.VERTICAL, command=self.log_txt.yview)
+        log_scroll.grid(row=0, column=1, sticky=tk.NS)
+        self.log_txt.configure(yscrollcommand=log_scroll.set)
+        for level, color in self.LOG_LEVEL_COLORS.items():
+            self.log_txt.tag_configure(level, foreground=color)
+        # Лог остаётся в состоянии NORMAL (без переключения state на каждую вставку),
+        # а правка пользователем блокируется привязками; выделение и копирование работают
+        self.log_txt.bind("<Key>", self._block_log_edit)
+        # Вставка средней кнопкой мыши приходит виртуальным событием <<PasteSelection>> (на отпускание кнопки)
+        for sequence in ("<<Paste>>", "<<PasteSelection>>", "<<Cut>>", "<<Clear>>", "<<Undo>>", "<<Redo>>", "<Button-2>"):
+            self.log_txt.bind(sequence, lambda e: "break")
 
         # Кнопки управления
         btn_frame = ttk.Frame(self)
@@ -106,12 +142,29 @@ class ProcessTab(ttk.Frame):
         self.clear_log_btn = ttk.Button(btn_frame, text="🗑 Очистить лог")
         self.clear_log_btn.pack(side=tk.LEFT, padx=5)
         ToolTip(self.clear_log_btn, "Очистить окно лога.")
+        self.show_debug_var = tk.BooleanVar(self, value=False)
+        self.show_debug_cb = ttk.Checkbutton(btn_frame, text="Показывать DEBUG", variable=self.show_debug_var)
+        self.show_debug_cb.pack(side=tk.LEFT, padx=5)
+        ToolTip(self.show_debug_cb, "Выводить отладочные сообщения в лог.")
+        # Копия флажка для проверки при каждом разборе очереди без обращения к Tcl (обновляет MainApplication)
+        self.show_debug = False
+
+        # Виджеты, блокируемые set_enabled; список строится один раз
+        self._toggleable = (
+            self.url_ent, self.y_ent, self.out_dir_ent,
+            self.browse_y_btn, self.browse_out_btn, self.start_btn,
+            *action_cbs,
+        )
+        self._enabled = True
 
     def _browse_y(self):
+        # filedialog (вместе с simpledialog) загружается при первом открытии диалога, а не при старте
+        from tkinter import filedialog
         file = filedialog.askopenfilename(filetypes=[("Audio", "*.mp3 *.m4a"), ("All", "*.*")])
         if file: self.y_ent.delete(0, tk.END); self.y_ent.insert(0, file)
 
     def _browse_out(self):
+        from tkinter import filedialog
         dir = filedialog.askdirectory()
         if dir: self.out_dir_var.set(dir)
 
@@ -124,16 +177,78 @@ class ProcessTab(ttk.Frame):
     def get_output_dir(self) -> str:
         return self.out_dir_var.get().strip()
 
+    def _sync_action(self, key: str) -> None:
+        if self.action_vars[key].get():
+            self._selected_actions.add(key)
+        else:
+            self._selected_actions.discard(key)
+
     def get_selected_actions(self) -> List[str]:
-        return [k for k,v in self.action_vars.items() if v.get()]
+        return [k for k in self.ACTION_KEYS if k in self._selected_actions]
+
+    def set_enabled(self, enabled: bool) -> None:
+        if enabled == self._enabled:
+            return
+        self._enabled = enabled
+        state = tk.NORMAL if enabled else tk.DISABLED
+        for widget in self._toggleable:
+            widget.configure(state=state)
 
     def add_log_message(self, msg: str, level: str = 'INFO') -> None:
-        self.log_txt.configure(state=tk.NORMAL)
-        self.log_txt.insert(tk.END, f"[{level}] {msg}\n")
+        self.add_log_messages([(msg, level)])
+
+    def add_log_messages(self, messages: List[Tuple[str, str]]) -> None:
+        """
+        Добавляет пачку сообщений (текст, уровень) в лог одним вызовом insert.
+        Подряд идущие строки одного уровня объединяются в один сегмент с тегом уровня.
+        """
+        if not messages:
+            return
+        # Пачка больше лимита вытеснила бы весь текущий лог: он очищается сразу,
+        # а в Text вставляется только хвост пачки, без строк, которые тут же пришлось бы удалять
+        if len(messages) >= self.MAX_LOG_LINES:
+            messages = messages[-self.MAX_LOG_LINES:]
+            self.log_txt.delete('1.0', tk.END)
+            self._log_line_count = 0
+        segments: List[Tuple[str, List[str]]] = []
+        for msg, level in messages:
+            if segments and segments[-1][0] == level:
+                segments[-1][1].append(msg)
+            else:
+                segments.append((level, [msg]))
+        # Префикс уровня и перевод строки вставляются join'ом, без отдельной строки на каждое сообщение
+        args: List[object] = []
+        for level, msgs in segments:
+            prefix = f"[{level}] "
+            text = prefix + f"\n{prefix}".join(msgs) + "\n"
+            self._log_line_count += text.count("\n")
+            args += [text, (self.LOG_LEVEL_TAGS.get(level, 'INFO'),)]
+        # Пользователь прокрутил лог вверх: новые строки добавляются без прокрутки
+        autoscroll = not self._scroll_pending and self.log_txt.yview()[1] >= self.LOG_AUTOSCROLL_THRESHOLD
+        self.log_txt.insert(tk.END, *args)
+        # Обрезка порциями, чтобы удаление происходило не на каждой вставке
+        if self._log_line_count > self.MAX_LOG_LINES:
+            trim = self._log_line_count - self.MAX_LOG_LINES + self.LOG_TRIM_CHUNK
+            self.log_txt.delete('1.0', f'{trim + 1}.0')
+            self._log_line_count -= trim
+        # Одна прокрутка на цикл простоя, сколько бы пачек ни было вставлено до него.
+        # update()/update_idletasks() здесь не вызываются: Tk сам объединяет перерисовки между пачками.
+        if autoscroll:
+            self._scroll_pending = True
+            self.after_idle(self._scroll_log_to_end)
+
+    def _scroll_log_to_end(self) -> None:
+        self._scroll_pending = False
         self.log_txt.see(tk.END)
-        self.log_txt.configure(state=tk.DISABLED)
 
     def clear_log(self) -> None:
-        self.log_txt.configure(state=tk.NORMAL)
         self.log_txt.delete('1.0', tk.END)
-        self.log_txt.configure(state=tk.DISABLED)
+        self._log_line_count = 0
+
+    def _block_log_edit(self, event: tk.Event) -> Optional[str]:
+        """Пропускает навигацию и копирование, остальные нажатия клавиш в логе блокирует."""
+        if event.keysym in self.LOG_NAVIGATION_KEYS:
+            return None
+        if event.state & 0x4 and event.keysym.lower() in self.LOG_CONTROL_KEYS:
+            return None
+        return "break"
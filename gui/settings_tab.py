@@ -37,9 +37,31 @@ class ToolTip:
             tw.destroy()
 
 class SettingsTab(ttk.Frame):
-    """Вкладка Настройки: языки, форматы и громкость"""
+    """
+    Вкладка Настройки: языки, форматы и громкость.
+    Виджеты создаются при первом показе вкладки; до этого get_settings возвращает значения по умолчанию.
+    """
     def __init__(self, parent, *args, **kwargs):
         super().__init__(parent, *args, **kwargs)
+        self._built = False
+        self._enabled = True
+        # Значения по умолчанию до построения вкладки (те же, что у StringVar в _build_ui)
+        self._pending_settings = (
+            ('source_lang', constants.SOURCE_LANG_DEFAULT),
+            ('target_lang', constants.TARGET_LANG_DEFAULT),
+            ('subtitle_lang', constants.SUB_LANG_DEFAULT),
+            ('subtitle_format', constants.SUB_FORMAT_DEFAULT),
+            ('yt_dlp_format', constants.YT_DLP_FORMAT_DEFAULT),
+            ('video_format_ext', constants.VIDEO_FORMAT_EXT_DEFAULT),
+            ('original_volume', constants.ORIGINAL_VOLUME_DEFAULT),
+            ('added_volume', constants.ADDED_VOLUME_DEFAULT),
+            ('merged_audio_codec', constants.MERGED_AUDIO_CODEC_DEFAULT),
+        )
+        self._map_bind_id = self.bind("<Map>", self._on_first_map, add="+")
+
+    def _on_first_map(self, event=None):
+        """Строит виджеты при первом отображении вкладки в Notebook."""
+        self.unbind("<Map>", self._map_bind_id)
         self._build_ui()
 
     def _build_ui(self):
@@ -109,30 +131,50 @@ class SettingsTab(ttk.Frame):
         self.merged_audio_codec_ent.grid(row=8, column=1, sticky=tk.EW, padx=5)
         ToolTip(self.merged_audio_codec_ent, "Кодек для смешанного аудио (напр. aac)")
 
+        # Виджеты, блокируемые set_enabled; список строится один раз
+        self._toggleable = (
+            self.source_lang_ent, self.target_lang_ent,
+            self.subtitle_lang_ent, self.subtitle_format_ent,
+            self.yt_dlp_format_ent, self.video_format_ext_ent,
+            self.original_volume_ent, self.added_volume_ent,
+            self.merged_audio_codec_ent,
+        )
+
+        # Пары (ключ настройки, переменная) для get_settings; строятся один раз
+        self._setting_vars = (
+            ('source_lang', self.source_lang_var),
+            ('target_lang', self.target_lang_var),
+            ('subtitle_lang', self.subtitle_lang_var),
+            ('subtitle_format', self.subtitle_format_var),
+            ('yt_dlp_format', self.yt_dlp_format_var),
+            ('video_format_ext', self.video_format_ext_var),
+            ('original_volume', self.original_volume_var),
+            ('added_volume', self.added_volume_var),
+            ('merged_audio_codec', self.merged_audio_codec_var),
+        )
+
+        self._built = True
+        # Блокировка, запрошенная до построения вкладки, применяется к созданным виджетам
+        if not self._enabled:
+            self._enabled = True
+            self.set_enabled(False)
+
     def get_settings(self) -> Dict[str, Any]:
-        settings = {
-            'source_lang': self.source_lang_var.get().strip(),
-            'target_lang': self.target_lang_var.get().strip(),
-            'subtitle_lang': self.subtitle_lang_var.get().strip(),
-            'subtitle_format': self.subtitle_format_var.get().strip(),
-            'yt_dlp_format': self.yt_dlp_format_var.get().strip(),
-            'video_format_ext': self.video_format_ext_var.get().strip(),
-            'original_volume': self.original_volume_var.get().strip(),
-            'added_volume': self.added_volume_var.get().strip(),
-            'merged_audio_codec': self.merged_audio_codec_var.get().strip(),
-        }
+        if self._built:
+            settings = {key: var.get().strip() for key, var in self._setting_vars}
+        else:
+            settings = {key: str(value).strip() for key, value in self._pending_settings}
         # Sanitize
         settings['video_format_ext'] = settings['video_format_ext'].lstrip('.')
         settings['subtitle_format'] = settings['subtitle_format'].lstrip('.')
         return settings
 
     def set_enabled(self, enabled: bool) -> None:
+        if enabled == self._enabled:
+            return
+        self._enabled = enabled
+        if not self._built:
+            return
         state = tk.NORMAL if enabled else tk.DISABLED
-        for widget in [
-            self.source_lang_ent, self.target_lang_ent,
-            self.subtitle_lang_ent, self.subtitle_format_ent,
-            self.yt_dlp_format_ent, self.video_format_ext_ent,
-            self.original_volume_ent, self.added_volume_ent,
-            self.merged_audio_codec_ent
-        ]:
+        for widget in self._toggleable:
             widget.configure(state=state)
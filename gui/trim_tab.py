@@ -1,7 +1,7 @@
 # File: gui/trim_tab.py
 
 import tkinter as tk
-from tkinter import ttk, filedialog
+from tkinter import ttk
 from utils.utils import is_valid_time_format, generate_trimmed_filename
 
 # Простой класс тултипов (можно импортировать из process_tab)
@@ -87,13 +87,20 @@ class TrimTab(ttk.Frame):
         self.trim_btn.grid(row=4, column=0, columnspan=4, pady=10)
         ToolTip(self.trim_btn, "Запустить обрезку медиафайла")
 
+        # Виджеты, блокируемые set_enabled; список строится один раз
+        self._toggleable = (self.input_ent, self.output_ent, self.start_ent, self.end_ent, self.trim_btn)
+        self._enabled = True
+
     def _browse_input(self):
+        # filedialog (вместе с simpledialog) загружается при первом открытии диалога, а не при старте
+        from tkinter import filedialog
         f = filedialog.askopenfilename(filetypes=[("Media", "*.mp4 *.mp3 *.mkv *.wav"), ("All", "*.*")])
         if f:
             self.input_ent.delete(0, tk.END)
             self.input_ent.insert(0, f)
 
     def _browse_output(self):
+        from tkinter import filedialog
         f = filedialog.asksaveasfilename(defaultextension=".mp4",
                                          filetypes=[("MP4", "*.mp4"), ("All", "*.*")])
         if f:
@@ -125,6 +132,9 @@ class TrimTab(ttk.Frame):
         return self.end_var.get().strip()
 
     def set_enabled(self, enabled: bool) -> None:
+        if enabled == self._enabled:
+            return
+        self._enabled = enabled
         state = tk.NORMAL if enabled else tk.DISABLED
-        for widget in [self.input_ent, self.output_ent, self.start_ent, self.end_ent, self.trim_btn]:
+        for widget in self._toggleable:
             widget.configure(state=state)
@@ -0,0 +1,31 @@
+from enum import IntEnum
+from typing import Optional
+
+
+class Action(IntEnum):
+    """Действия обработки URL. Значение действия — индекс в таблицах VideoService."""
+    MD = 0  # Скачать метаданные
+    DV = 1  # Скачать видео
+    DS = 2  # Скачать субтитры
+    DT = 3  # Перевести субтитры
+    DA = 4  # Смешать аудио
+    TM = 5  # Перевести метаданные
+    TP = 6  # Скачать превью
+
+    @property
+    def key(self) -> str:
+        """Строковый ключ действия, используемый GUI ('md', 'dv', ...)."""
+        return self.name.lower()
+
+    @property
+    def bit(self) -> int:
+        """Бит действия для масок множеств действий."""
+        return 1 << self.value
+
+    def __str__(self) -> str:
+        return self.key
+
+    @classmethod
+    def from_str(cls, key: str) -> Optional['Action']:
+        """Преобразует строковый ключ ('md') в Action. Возвращает None для неизвестного ключа."""
+        return cls.__members__.get(key.upper())
@@ -1,10 +1,12 @@
 from __future__ import annotations
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional, List
+from typing import Any, Dict, Optional, List, Set
+import os
 import constants
+from utils.utils import get_tool_path
 
-@dataclass
+@dataclass(slots=True)
 class ProcessingContext:
     """Контекст обработки видео, хранит входные данные, настройки и пути результатов."""
     url: str
@@ -21,6 +23,8 @@ class ProcessingContext:
     original_volume: str = constants.ORIGINAL_VOLUME_DEFAULT
     added_volume: str = constants.ADDED_VOLUME_DEFAULT
     merged_audio_codec: str = constants.MERGED_AUDIO_CODEC_DEFAULT
+    # Выводятся ли DEBUG-сообщения в GUI: без них traceback и дампы контекста не форматируются
+    debug: bool = False
 
     base: Optional[str] = None
     title: Optional[str] = None
@@ -35,6 +39,16 @@ class ProcessingContext:
     merged_video_path: Optional[Path] = None
     thumbnail_path: Optional[Path] = None
 
+    # Описание скачанного видео от ffprobe (None, если проверка не выполнялась)
+    probe_info: Optional[Dict[str, Any]] = None
+
+    # Пути к внешним инструментам, найденные VideoService при проверке доступности
+    tool_paths: Dict[str, Path] = field(default_factory=dict)
+
+    def get_tool_path(self, tool_name: str) -> Path:
+        """Возвращает заранее найденный путь к инструменту или ищет его через utils.get_tool_path."""
+        return self.tool_paths.get(tool_name) or get_tool_path(tool_name)
+
     def _get_path(self, suffix: str, ext: str) -> Optional[Path]:
         if not self.base:
             return None
@@ -67,3 +81,11 @@ class ProcessingContext:
 
     def get_thumbnail_filepath(self) -> Optional[Path]:
         return self._get_path("", constants.THUMBNAIL_EXT_DEFAULT)
+
+    def existing_outputs(self) -> Set[Path]:
+        """Возвращает пути всех файлов в output_dir, полученные одним чтением директории."""
+        try:
+            with os.scandir(self.output_dir) as it:
+                return {self.output_dir / entry.name for entry in it if entry.is_file()}
+        except OSError:
+            return set()
@@ -6,42 +6,132 @@ from commands.download_metadata import DownloadMetadata
 from commands.translate_metadata import TranslateMetadata
 from commands.merge_audio import MergeAudio
 from commands.download_thumbnail import DownloadThumbnail # Добавлено
+from commands.download_assets import DownloadAssets
+from model.actions import Action
 from model.processing_context import ProcessingContext
-from utils.utils import find_executable, get_tool_path
+from utils.utils import find_executable, tool_path_const_name
+from utils import ffprobe, metadata_cache
 import constants
+import graphlib
+import hashlib
+import json
+import multiprocessing
 import os
+import threading
 import subprocess # For specific exception handling
-from typing import List, Dict, Any, Optional, Type
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import List, Dict, Any, Callable, FrozenSet, Optional, Tuple, Type
+
+
+def _action_graph(prerequisites: Dict[Action, Tuple[Action, ...]], metadata_mask: int) -> Dict[Action, FrozenSet[Action]]:
+    """Строит граф зависимостей всех действий, включая зависимость от 'md' для действий из metadata_mask."""
+    graph = {}
+    for action in Action:
+        deps = set(prerequisites.get(action, ()))
+        if action != Action.MD and action.bit & metadata_mask:
+            deps.add(Action.MD)
+        graph[action] = frozenset(deps)
+    return graph
+
+
+def _thumbnail_filepath(context: ProcessingContext) -> Optional[Path]:
+    """Путь к уже скачанному превью с любым из расширений yt-dlp, иначе путь по умолчанию."""
+    if not context.base:
+        return None
+    for ext in DownloadThumbnail.THUMBNAIL_EXTENSIONS:
+        candidate = context.output_dir / f"{context.base}{ext}"
+        if candidate.exists():
+            return candidate
+    return context.get_thumbnail_filepath()
+
 
 class VideoService:
     """
     Сервис, оркеструющий операции обработки видео с использованием команд и контекста.
     """
-    COMMAND_MAPPING: Dict[str, Type[ActionCommand]] = {
-        'md': DownloadMetadata,
-        'dv': DownloadVideo,
-        'ds': DownloadSubtitles,
-        'dt': TranslateSubtitles,
-        'da': MergeAudio,
-        'tm': TranslateMetadata,
-        'tp': DownloadThumbnail, # Добавлено: Действие для скачивания превью
-    }
+    # Классы команд, индексируемые значением Action
+    COMMAND_TABLE: Tuple[Type[ActionCommand], ...] = (
+        DownloadMetadata,   # Action.MD
+        DownloadVideo,      # Action.DV
+        DownloadSubtitles,  # Action.DS
+        TranslateSubtitles, # Action.DT
+        MergeAudio,         # Action.DA
+        TranslateMetadata,  # Action.TM
+        DownloadThumbnail,  # Action.TP
+    )
 
     # Зависимости: команды, требующие, чтобы 'md' (DownloadMetadata) был выполнен первым
-    # для установки базового имени файла 'base' в контексте.
-    METADATA_DEPENDENCIES = {'dv', 'ds', 'dt', 'da', 'tm', 'tp'} # 'tp' добавлен
+    # для установки базового имени файла 'base' в контексте. Хранится как битовая маска Action.bit.
+    METADATA_DEPENDENCIES_MASK: int = (
+        Action.DV.bit | Action.DS.bit | Action.DT.bit | Action.DA.bit | Action.TM.bit | Action.TP.bit
+    )
+
+    # Зависимости между действиями (помимо зависимости от 'md'): действие ждёт завершения перечисленных
+    ACTION_PREREQUISITES: Dict[Action, Tuple[Action, ...]] = {
+        Action.DT: (Action.DS,), # Перевод субтитров использует скачанные субтитры
+        Action.DA: (Action.DV,), # Смешивание аудио использует скачанное видео
+    }
+
+    # Полный граф зависимостей и порядок выполнения, вычисляемые один раз при загрузке класса
+    ACTION_GRAPH: Dict[Action, FrozenSet[Action]] = _action_graph(ACTION_PREREQUISITES, METADATA_DEPENDENCIES_MASK)
+    EXECUTION_ORDER: Tuple[Action, ...] = tuple(graphlib.TopologicalSorter(ACTION_GRAPH).static_order())
+
+    # Действия, которые DownloadAssets выполняет тем же вызовом yt-dlp, что и 'md'
+    BATCHED_WITH_METADATA_MASK: int = Action.DS.bit | Action.TP.bit
+    # Видео скачивается вместе с 'md', только если нет действий, которые иначе шли бы параллельно с загрузкой видео
+    FUSED_VIDEO_BLOCKERS_MASK: int = Action.DT.bit | Action.TM.bit
 
     # Зависимости от инструментов для действий
-    TOOL_DEPENDENCIES: Dict[str, List[str]] = {
-        'md': ['yt-dlp'],
-        'dv': ['yt-dlp', 'ffmpeg'], # ffmpeg часто нужен yt-dlp для слияния форматов
-        'ds': ['yt-dlp'],
-        'dt': [], # Требует deep_translator, pysubs2 (Python libs)
-        'da': ['ffmpeg'],
-        'tm': [], # Требует deep_translator (Python lib)
-        'tp': ['yt-dlp'], # Добавлено
+    TOOL_DEPENDENCIES: Dict[Action, List[str]] = {
+        Action.MD: ['yt-dlp'],
+        Action.DV: ['yt-dlp', 'ffmpeg'], # ffmpeg часто нужен yt-dlp для слияния форматов
+        Action.DS: ['yt-dlp'],
+        Action.DT: [], # Требует deep_translator, pysubs2 (Python libs)
+        Action.DA: ['ffmpeg'],
+        Action.TM: [], # Требует deep_translator (Python lib)
+        Action.TP: ['yt-dlp'],
+    }
+
+    # Пути к инструментам, заданные в constants.py (None, если не заданы)
+    TOOL_CONFIGURED_PATHS: Dict[str, Optional[str]] = {
+        tool: getattr(constants, tool_path_const_name(tool), None)
+        for tools in TOOL_DEPENDENCIES.values() for tool in tools
     }
 
+    # Ожидаемые исключения команд и шаблоны сообщений для них.
+    # Порядок важен: подклассы должны идти раньше базовых классов (FileNotFoundError раньше IOError).
+    EXCEPTION_MESSAGES: List[Tuple[Type[BaseException], str]] = [
+        (FileNotFoundError, "✖ ФАЙЛ/ИНСТРУМЕНТ НЕ НАЙДЕН во время {action_name}: {e}"),
+        (subprocess.CalledProcessError, "✖ ВНЕШНИЙ ИНСТРУМЕНТ ЗАВЕРШИЛСЯ С ОШИБКОЙ во время {action_name} (Код выхода: {e.returncode}). Проверьте логи выше для деталей."),
+        (ValueError, "✖ ОШИБКА КОНФИГУРАЦИИ/ЗНАЧЕНИЯ во время {action_name}: {e}"),
+        (IOError, "✖ ОШИБКА ВВОДА/ВЫВОДА ФАЙЛА во время {action_name}: {e}"),
+    ]
+    EXPECTED_EXCEPTIONS: Tuple[Type[BaseException], ...] = tuple(exc_type for exc_type, _ in EXCEPTION_MESSAGES)
+
+    # Результаты действий для кеша повторных запусков:
+    # (атрибут контекста, ожидаемый путь результата, настройки, влияющие на результат)
+    ACTION_OUTPUTS: Dict[Action, Tuple[str, Callable[[ProcessingContext], Optional[Path]], Tuple[str, ...]]] = {
+        Action.DV: ('video_path', lambda ctx: ctx.get_video_filepath(), ('yt_dlp_format', 'video_format_ext')),
+        Action.DS: ('subtitle_path', lambda ctx: ctx.get_subtitle_filepath(ctx.subtitle_lang), ('subtitle_lang', 'subtitle_format')),
+        Action.DT: ('translated_subtitle_path', lambda ctx: ctx.get_subtitle_filepath(ctx.target_lang), ('subtitle_lang', 'subtitle_format', 'source_lang', 'target_lang')),
+        Action.DA: ('merged_video_path', lambda ctx: ctx.get_merged_video_filepath(), ('yandex_audio', 'original_volume', 'added_volume', 'merged_audio_codec', 'video_format_ext')),
+        Action.TM: ('translated_metadata_path', lambda ctx: ctx.get_metadata_filepath(lang=ctx.target_lang), ('source_lang', 'target_lang')),
+        Action.TP: ('thumbnail_path', _thumbnail_filepath, ()),
+    }
+    CACHE_KEY_SUFFIX = ".cachekey"
+    # Суффикс, под которым устаревший результат хранится, пока команда создаёт новый
+    STALE_SUFFIX = ".stale"
+
+    # Настройки, которые можно передать в ProcessingContext. Перечислены явно: поля результатов
+    # и состояния (base, *_path, probe_info) заполняются только командами
+    CONTEXT_SETTING_FIELDS = frozenset((
+        'source_lang', 'target_lang', 'subtitle_lang', 'subtitle_format',
+        'video_format_ext', 'yt_dlp_format', 'original_volume', 'added_volume', 'merged_audio_codec',
+        'debug',
+    ))
+
     def __init__(self, logger: LoggerCallable):
         """
         Инициализирует сервис.
@@ -50,33 +140,265 @@ class VideoService:
             logger: Функция для логирования сообщений.
         """
         self.logger: LoggerCallable = logger
+        # Экземпляры команд создаются один раз и переиспользуются во всех запусках perform_actions.
+        # DownloadAssets создаётся на каждый запуск: его флаги зависят от выбранных действий.
+        self._commands: Tuple[ActionCommand, ...] = tuple(command_class(logger) for command_class in self.COMMAND_TABLE)
+        # Инструменты, уже найденные в этом процессе, повторно не ищутся
+        self._verified_tools: Dict[str, Path] = {}
+
+    def _check_tool_availability(self, actions: List[Action]) -> Optional[Dict[str, Path]]:
+        """
+        Проверяет доступность необходимых внешних инструментов для выбранных действий.
 
-    def _check_tool_availability(self, actions: List[str]) -> bool:
-        """Проверяет доступность необходимых внешних инструментов для выбранных действий."""
+        Returns:
+            Словарь {инструмент: путь}, если все инструменты найдены, иначе None.
+        """
         required_tools = set()
         for action in actions:
             required_tools.update(self.TOOL_DEPENDENCIES.get(action, []))
 
         if not required_tools:
              self.logger("[DEBUG] Внешние инструменты не требуются для выбранных действий.")
-             return True
+             return {}
+
+        to_check = required_tools - self._verified_tools.keys()
+        if to_check:
+            self.logger(f"[DEBUG] Проверка доступности инструментов: {to_check}")
+            # Поиск по PATH для каждого инструмента выполняется параллельно
+            with ThreadPoolExecutor(max_workers=len(to_check)) as executor:
+                found = dict(zip(to_check, executor.map(
+                    lambda tool: find_executable(tool, self.TOOL_CONFIGURED_PATHS.get(tool)), to_check)))
 
-        self.logger(f"[DEBUG] Проверка доступности инструментов: {required_tools}")
-        all_tools_found = True
-        for tool in required_tools:
-             path_const_name = f"{tool.upper()}_PATH"
-             configured_path = getattr(constants, path_const_name, None)
+            all_tools_found = True
+            for tool, path in found.items():
+                 if path:
+                     self._verified_tools[tool] = path
+                 else:
+                     self.logger(f"[ERROR] Необходимый инструмент '{tool}' не найден.")
+                     self.logger(f"[ERROR] Пожалуйста, установите '{tool}' и убедитесь, что он в системном PATH,")
+                     self.logger(f"[ERROR] или укажите полный путь в constants.py (переменная: {tool_path_const_name(tool)}).")
+                     all_tools_found = False
+            if not all_tools_found:
+                return None
+        else:
+            self.logger(f"[DEBUG] Инструменты уже проверены: {required_tools}")
+
+        return {tool: self._verified_tools[tool] for tool in required_tools}
 
-             if not find_executable(tool, configured_path):
-                 self.logger(f"[ERROR] Необходимый инструмент '{tool}' не найден.")
-                 self.logger(f"[ERROR] Пожалуйста, установите '{tool}' и убедитесь, что он в системном PATH,")
-                 self.logger(f"[ERROR] или укажите полный путь в constants.py (переменная: {path_const_name}).")
-                 all_tools_found = False
-             else:
-                  pass
+    def _cache_key(self, action: Action, context: ProcessingContext) -> str:
+        """Хеш от действия, URL и настроек, влияющих на результат действия."""
+        setting_names = self.ACTION_OUTPUTS[action][2]
+        relevant = {name: str(getattr(context, name)) for name in setting_names}
+        payload = json.dumps([action.key, context.url, relevant], sort_keys=True)
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=8).hexdigest()
 
-        return all_tools_found
+    def _use_cached_result(self, action: Action, context: ProcessingContext, action_name: str,
+                           log: LoggerCallable) -> Tuple[bool, Optional[Tuple[Path, Path]]]:
+        """
+        Проверяет, есть ли на диске результат действия, полученный с теми же URL и настройками.
 
+        Returns:
+            (True, None), если результат есть: его путь записан в контекст.
+            (False, (путь, копия)), если результат получен с другими настройками: файл отложен
+            под суффиксом STALE_SUFFIX, чтобы команда создала его заново (см. _settle_stale_result).
+            (False, None) в остальных случаях.
+        """
+        spec = self.ACTION_OUTPUTS.get(action)
+        if not spec:
+            return False, None
+        attr, get_path, _ = spec
+        path = get_path(context)
+        if not path:
+            return False, None
+        sidecar = path.with_name(path.name + self.CACHE_KEY_SUFFIX)
+        try:
+            stored_key = sidecar.read_text(encoding='utf-8').strip()
+        except OSError:
+            return False, None
+        if not path.exists():
+            return False, None
+
+        if stored_key == self._cache_key(action, context):
+            setattr(context, attr, path)
+            log(f"[INFO] Пропуск {action_name}: результат уже получен с теми же настройками ({path}).")
+            return True, None
+
+        log(f"[INFO] Настройки для {action_name} изменились, результат будет создан заново: {path}")
+        stale = path.with_name(path.name + self.STALE_SUFFIX)
+        try:
+            path.replace(stale)
+        except OSError as e:
+            log(f"[WARN] Не удалось отложить устаревший результат {path}: {e}")
+            return False, None
+        return False, (path, stale)
+
+    def _settle_stale_result(self, path: Path, stale: Path, replaced: bool, log: LoggerCallable) -> None:
+        """Удаляет отложенный устаревший результат, если команда создала новый, иначе возвращает его на место."""
+        try:
+            if replaced:
+                stale.unlink()
+            else:
+                stale.replace(path)
+                log(f"[INFO] Новый результат не получен, прежний файл восстановлен: {path}")
+        except OSError as e:
+            log(f"[WARN] Не удалось обработать отложенный файл {stale}: {e}")
+
+    def _output_exists(self, action: Action, context: ProcessingContext) -> bool:
+        """Есть ли уже на диске результат действия (команды такой файл не перезаписывают)."""
+        spec = self.ACTION_OUTPUTS.get(action)
+        path = spec[1](context) if spec else None
+        return bool(path) and path.exists()
+
+    def _store_cache_key(self, action: Action, context: ProcessingContext, log: LoggerCallable) -> None:
+        """
+        Сохраняет рядом с результатом действия файл с ключом кеша.
+        Вызывается, только если результат создан в этом запуске, а не оставлен командой от прошлого.
+        """
+        spec = self.ACTION_OUTPUTS.get(action)
+        if not spec:
+            return
+        path = getattr(context, spec[0])
+        if not path or not path.exists():
+            return
+        sidecar = path.with_name(path.name + self.CACHE_KEY_SUFFIX)
+        try:
+            sidecar.write_text(self._cache_key(action, context), encoding='utf-8')
+        except OSError as e:
+            log(f"[WARN] Не удалось сохранить ключ кеша {sidecar}: {e}")
+
+
+    def _use_cached_metadata(self, command_instance: ActionCommand, context: ProcessingContext, log: LoggerCallable) -> bool:
+        """Заполняет контекст метаданными из дискового кеша вместо запроса к yt-dlp."""
+        cached = metadata_cache.get(context.url)
+        if cached is None:
+            return False
+        log("[INFO] Метаданные взяты из кеша, запрос к yt-dlp пропущен.")
+        command_instance.apply_metadata(context, cached)
+        return True
+
+    def _probe_video(self, context: ProcessingContext, log: LoggerCallable) -> None:
+        """
+        Однократно проверяет скачанное видео через ffprobe перед запуском ffmpeg и сохраняет результат в context.probe_info.
+        Без ffprobe проверка пропускается. Вызывает ValueError, если файл не читается или в нём нет видеопотока.
+        """
+        if context.probe_info is not None or not context.video_path:
+            return
+        ffprobe_path = find_executable('ffprobe', constants.FFPROBE_PATH)
+        if not ffprobe_path:
+            log("[DEBUG] ffprobe не найден, предварительная проверка видео пропущена.")
+            return
+        try:
+            info = ffprobe.probe_media(context.video_path, ffprobe_path)
+        except subprocess.CalledProcessError as e:
+            raise ValueError(f"ffprobe не смог прочитать видео {context.video_path}: {(e.stderr or '').strip()}") from e
+        if not ffprobe.has_stream(info, 'video'):
+            raise ValueError(f"В файле нет видеопотока: {context.video_path}")
+        context.probe_info = info
+        duration = ffprobe.duration_s(info)
+        log(f"[DEBUG] ffprobe: длительность {duration if duration is not None else '?'} с, "
+            f"аудиодорожка {'есть' if ffprobe.has_stream(info, 'audio') else 'отсутствует'}.")
+
+    def _action_logger(self, action: Action) -> LoggerCallable:
+        """Логгер, помечающий строки ключом действия: строки параллельных действий перемежаются в логе."""
+        tag = f"[{action.key}]"
+
+        def log(msg: str) -> None:
+            # Метка ставится после тега уровня ("[INFO]", "✖"), по которому ViewModel определяет уровень строки
+            if msg.startswith('['):
+                head = msg.find(']') + 1
+            else:
+                head = 1 if msg.startswith('✖') else 0
+            self.logger(f"{msg[:head]} {tag} {msg[head:].lstrip()}" if head else f"{tag} {msg}")
+        return log
+
+    def _run_action(self, action: Action, command_instance: ActionCommand, context: ProcessingContext,
+                    stop: Optional[threading.Event] = None) -> bool:
+        """
+        Выполняет одну команду с проверкой предусловий, кешем и обработкой ошибок.
+        Вызывается из пула потоков perform_actions; строки лога команды помечаются ключом действия.
+        Если stop уже установлен (другое действие завершилось с ошибкой), команда не запускается.
+
+        Returns:
+            True, если действие выполнено (или взято из кеша), иначе False.
+        """
+        action_name = command_instance.__class__.__name__
+        log = self._action_logger(action)
+        command_instance.log = log
+        if stop is not None and stop.is_set():
+            log(f"[INFO] {action_name} отменено из-за ошибки другого действия.")
+            return False
+        log(f"--- ▶ Выполнение: {action_name} ---")
+
+        stale: Optional[Tuple[Path, Path]] = None
+        done = False
+        try:
+            # Проверка предварительных условий: зависит ли это действие от метаданных?
+            if action.bit & self.METADATA_DEPENDENCIES_MASK:
+                if context.base is None:
+                    log(f"[ERROR] Невозможно выполнить '{action_name}': Требуемое имя файла 'base' отсутствует в контексте.")
+                    log("[ERROR] Убедитесь, что действие 'md' (Скачать метаданные) выполняется успешно первым.")
+                    return False
+
+            cached, stale = self._use_cached_result(action, context, action_name, log)
+            if cached:
+                done = True
+                return True
+
+            if action == Action.MD and self._use_cached_metadata(command_instance, context, log):
+                done = True
+                return True
+
+            if action == Action.DA:
+                self._probe_video(context, log)
+
+            # Файл, оставшийся без ключа кеша, команда пропустит: ключ для него не записывается
+            produces_output = not self._output_exists(action, context)
+
+            # Выполнение действия команды
+            command_instance.execute(context)
+            if action == Action.MD and command_instance.metadata:
+                try:
+                    metadata_cache.put(context.url, command_instance.metadata)
+                except OSError as e:
+                    log(f"[WARN] Не удалось сохранить метаданные в кеш: {e}")
+            if produces_output:
+                self._store_cache_key(action, context, log)
+            done = True
+            log(f"--- ✔ Завершено: {action_name} ---")
+            return True
+
+        # Обработка ожидаемых исключений
+        except self.EXPECTED_EXCEPTIONS as e:
+            template = next(msg for exc_type, msg in self.EXCEPTION_MESSAGES if isinstance(e, exc_type))
+            log(template.format(action_name=action_name, e=e))
+            return False
+        except Exception as e:
+            log(f"✖ НЕОЖИДАННАЯ ОШИБКА во время {action_name}: {type(e).__name__} - {e}")
+            if context.debug:
+                log(f"[DEBUG] Traceback:\n{traceback.format_exc()}")
+            return False
+        finally:
+            if stale:
+                # Устаревший файл заменяется, только если команда успешно создала новый
+                output = getattr(context, self.ACTION_OUTPUTS[action][0])
+                self._settle_stale_result(*stale, replaced=done and bool(output) and output.exists(), log=log)
+            if not done and stop is not None:
+                # Флаг ставится до возврата из потока, чтобы освободившийся поток пула не взял следующее действие
+                stop.set()
+
+    def _stop_after_failure(self, failed: Action, running: Dict[Future, Tuple[Action, ActionCommand]]) -> None:
+        """
+        Останавливает обработку после первой ошибки: новые действия не запускаются,
+        ещё не начатые в пуле отменяются (stop уже установлен в _run_action). Уже запущенные действия
+        прервать нельзя (внешний инструмент работает до конца), они дорабатывают, но их результаты не используются.
+        """
+        still_running = [action.key for future, (action, _) in running.items()
+                         if not future.cancel() and not future.done()]
+        if still_running:
+            self.logger(f"[WARN] Действие '{failed.key}' завершилось с ошибкой. Ожидание уже запущенных действий: "
+                        f"{still_running}; их результаты не будут использованы.")
+        else:
+            self.logger(f"[WARN] Действие '{failed.key}' завершилось с ошибкой, остальные действия отменены.")
 
     def perform_actions(self, url: str, yandex_audio: Optional[str], actions: List[str], output_dir: str, settings: Dict[str, Any]) -> bool:
         """
@@ -99,91 +421,110 @@ class VideoService:
         self.logger(f"[INFO] Запрошенные действия: {actions}")
         self.logger(f"[INFO] Настройки: Языки({settings.get('source_lang')}>{settings.get('target_lang')}), Субтитры({settings.get('subtitle_lang')}/{settings.get('subtitle_format')}), Видео({settings.get('video_format_ext')}), Громкость({settings.get('original_volume')}/{settings.get('added_volume')})")
 
+        requested: List[Action] = []
+        for key in actions:
+            action = Action.from_str(key)
+            if action is None:
+                self.logger(f"[WARN] Неизвестный ключ действия '{key}', пропуск.")
+            else:
+                requested.append(action)
+
         # 1. Проверка доступности инструментов
-        if not self._check_tool_availability(actions):
+        tool_paths = self._check_tool_availability(requested)
+        if tool_paths is None:
              self.logger("[ERROR] Прерывание обработки из-за отсутствия необходимых внешних инструментов.")
              return False
 
         # 2. Подготовка ProcessingContext
-        try:
-            context = ProcessingContext(
-                url=url,
-                yandex_audio=yandex_audio,
-                output_dir=output_dir,
-                **settings # Распаковка словаря настроек напрямую в поля контекста
-            )
+        context_settings = {k: v for k, v in settings.items() if k in self.CONTEXT_SETTING_FIELDS}
+        ignored_settings = settings.keys() - context_settings.keys()
+        if ignored_settings:
+            self.logger(f"[WARN] Неизвестные настройки проигнорированы: {sorted(ignored_settings)}")
+        context = ProcessingContext(
+            url=url,
+            yandex_audio=Path(yandex_audio) if yandex_audio else None,
+            output_dir=Path(output_dir),
+            tool_paths=tool_paths,
+            **context_settings
+        )
+        if context.debug:
             self.logger(f"[DEBUG] ProcessingContext инициализирован: {context}")
-        except TypeError as e:
-             self.logger(f"[ERROR] Не удалось инициализировать ProcessingContext с предоставленными настройками: {e}")
-             self.logger(f"[DEBUG] Предоставленные настройки: {settings}")
-             return False
 
-        # 3. Определение порядка выполнения: 'md' первым, если необходимо
-        ordered_actions = actions[:]
-        needs_metadata = any(action in self.METADATA_DEPENDENCIES for action in ordered_actions)
-
-        if needs_metadata:
-            if 'md' not in ordered_actions:
-                ordered_actions.insert(0, 'md')
-                self.logger("[INFO] Действие 'md' (Скачать метаданные) добавлено, так как оно требуется другими выбранными действиями.")
-            elif ordered_actions.index('md') != 0:
-                ordered_actions.remove('md')
-                ordered_actions.insert(0, 'md')
-                self.logger("[INFO] Действие 'md' (Скачать метаданные) перемещено в начало, так как это необходимое условие.")
-        else:
-             pass
+        # 3. Определение порядка выполнения: выбранные действия в статическом топологическом порядке
+        requested_mask = 0
+        for action in requested:
+            requested_mask |= action.bit
+        needs_metadata = bool(requested_mask & self.METADATA_DEPENDENCIES_MASK)
+
+        if needs_metadata and not requested_mask & Action.MD.bit:
+            requested_mask |= Action.MD.bit
+            self.logger("[INFO] Действие 'md' (Скачать метаданные) добавлено, так как оно требуется другими выбранными действиями.")
 
-        self.logger(f"[INFO] Итоговый порядок выполнения: {ordered_actions}")
+        ordered_actions = [action for action in self.EXECUTION_ORDER if action.bit & requested_mask]
+        self.logger(f"[INFO] Итоговый порядок выполнения: {[action.key for action in ordered_actions]}")
 
 
-        # 4. Последовательное выполнение команд
+        # 4. Выполнение команд: независимые действия запускаются параллельно
+        # 'ds' и 'tp' скачиваются вместе с метаданными, если 'md' выполняется
+        batched_mask = requested_mask & self.BATCHED_WITH_METADATA_MASK if needs_metadata else 0
+        if requested_mask & Action.DV.bit and not requested_mask & self.FUSED_VIDEO_BLOCKERS_MASK:
+            batched_mask |= Action.DV.bit
+        selected = frozenset(ordered_actions)
+        prerequisites = {action: self.ACTION_GRAPH[action] & selected for action in ordered_actions}
+
+        pending = list(ordered_actions)
+        completed: set = set()
+        running: Dict[Future, Tuple[Action, ActionCommand]] = {}
         success = True
-        for action_key in ordered_actions:
-            command_class = self.COMMAND_MAPPING.get(action_key)
-            if not command_class:
-                self.logger(f"[WARN] Неизвестный ключ действия '{action_key}', пропуск.")
-                continue
-
-            command_instance = command_class(self.logger)
-            action_name = command_instance.__class__.__name__
-            self.logger(f"--- ▶ Выполнение: {action_name} ---")
-
-            try:
-                # Проверка предварительных условий: зависит ли это действие от метаданных?
-                if action_key in self.METADATA_DEPENDENCIES:
-                    if context.base is None:
-                        self.logger(f"[ERROR] Невозможно выполнить '{action_name}': Требуемое имя файла 'base' отсутствует в контексте.")
-                        self.logger("[ERROR] Убедитесь, что действие 'md' (Скачать метаданные) выполняется успешно первым.")
-                        success = False
-                        break # Прекратить цепочку обработки
-
-                # Выполнение действия команды
-                command_instance.execute(context)
-                self.logger(f"--- ✔ Завершено: {action_name} ---")
-
-            # Обработка ожидаемых исключений
-            except FileNotFoundError as e:
-                self.logger(f"✖ ФАЙЛ/ИНСТРУМЕНТ НЕ НАЙДЕН во время {action_name}: {e}")
-                success = False
-                break
-            except subprocess.CalledProcessError as e:
-                self.logger(f"✖ ВНЕШНИЙ ИНСТРУМЕНТ ЗАВЕРШИЛСЯ С ОШИБКОЙ во время {action_name} (Код выхода: {e.returncode}). Проверьте логи выше для деталей.")
-                success = False
-                break
-            except ValueError as e:
-                self.logger(f"✖ ОШИБКА КОНФИГУРАЦИИ/ЗНАЧЕНИЯ во время {action_name}: {e}")
-                success = False
-                break
-            except IOError as e:
-                 self.logger(f"✖ ОШИБКА ВВОДА/ВЫВОДА ФАЙЛА во время {action_name}: {e}")
-                 success = False
-                 break
-            except Exception as e:
-                self.logger(f"✖ НЕОЖИДАННАЯ ОШИБКА во время {action_name}: {type(e).__name__} - {e}")
-                import traceback
-                self.logger(f"[DEBUG] Traceback:\n{traceback.format_exc()}")
-                success = False
-                break
+        stop = threading.Event()
+        with ThreadPoolExecutor(max_workers=constants.MAX_PARALLEL_ACTIONS) as executor:
+            while pending or running:
+                # Запуск всех действий, зависимости которых выполнены
+                progressed = success
+                while progressed:
+                    progressed = False
+                    for action in [a for a in pending if prerequisites[a] <= completed]:
+                        pending.remove(action)
+                        if action.bit & batched_mask:
+                            # DownloadAssets оставляет флаг только для файлов, созданных в этом запуске
+                            self._store_cache_key(action, context, self._action_logger(action))
+                            self.logger(f"[INFO] Действие '{action.key}' выполнено вместе с загрузкой метаданных.")
+                            completed.add(action)
+                            progressed = True
+                            continue
+                        if action == Action.MD and batched_mask:
+                            command_instance = DownloadAssets(self.logger,
+                                                              subtitles=bool(batched_mask & Action.DS.bit),
+                                                              thumbnail=bool(batched_mask & Action.TP.bit),
+                                                              video=bool(batched_mask & Action.DV.bit))
+                        else:
+                            command_instance = self._commands[action]
+                        future = executor.submit(self._run_action, action, command_instance, context, stop)
+                        running[future] = (action, command_instance)
+
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    action, command_instance = running.pop(future)
+                    if future.cancelled():
+                        continue
+                    if not future.result():
+                        if success:
+                            success = False
+                            self._stop_after_failure(action, running)
+                        continue
+                    if not success:
+                        continue # Результаты действий, завершившихся после ошибки, не используются
+                    completed.add(action)
+                    if isinstance(command_instance, DownloadAssets):
+                        # Не скачанные совмещённым вызовом ассеты обрабатываются своими командами
+                        batched_mask = 0
+                        if command_instance.fetched:
+                            batched_mask |= Action.DS.bit if command_instance.subtitles else 0
+                            batched_mask |= Action.TP.bit if command_instance.thumbnail else 0
+                            batched_mask |= Action.DV.bit if command_instance.video else 0
 
         # 5. Финальный отчет о статусе
         self.logger(f"[INFO] === Обработка {'Завершена' if success else 'Остановлена'} ===")
@@ -191,25 +532,92 @@ class VideoService:
             self.logger("🎉 Все выбранные действия успешно завершены.")
             self.logger("[INFO] --- Сгенерированные файлы (Проверьте наличие) ---")
             if context.base:
-                meta_orig = context.get_metadata_filepath(lang=None)
-                meta_trans = context.get_metadata_filepath(lang=context.target_lang)
-                video_file = context.get_video_filepath()
-                sub_orig = context.get_subtitle_filepath(lang=context.subtitle_lang)
-                sub_trans = context.get_subtitle_filepath(lang=context.target_lang)
-                merged_video = context.get_merged_video_filepath()
-                thumbnail_file = context.get_thumbnail_filepath() # Добавлено
-
-                if meta_orig and os.path.exists(meta_orig): self.logger(f"[INFO] Метаданные (Оригинал): {meta_orig}")
-                if meta_trans and os.path.exists(meta_trans): self.logger(f"[INFO] Метаданные ({context.target_lang}): {meta_trans}")
-                if video_file and os.path.exists(video_file): self.logger(f"[INFO] Видео ({context.video_format_ext}): {video_file}")
-                if sub_orig and os.path.exists(sub_orig): self.logger(f"[INFO] Субтитры ({context.subtitle_lang}, {context.subtitle_format}): {sub_orig}")
-                if sub_trans and os.path.exists(sub_trans): self.logger(f"[INFO] Субтитры ({context.target_lang}, {context.subtitle_format}): {sub_trans}")
-                if merged_video and os.path.exists(merged_video): self.logger(f"[INFO] Видео со смешанным аудио: {merged_video}")
-                if thumbnail_file and os.path.exists(thumbnail_file): self.logger(f"[INFO] Превью видео: {thumbnail_file}") # Добавлено
+                reports = [
+                    ("Метаданные (Оригинал)", context.get_metadata_filepath(lang=None)),
+                    (f"Метаданные ({context.target_lang})", context.get_metadata_filepath(lang=context.target_lang)),
+                    (f"Видео ({context.video_format_ext})", context.get_video_filepath()),
+                    (f"Субтитры ({context.subtitle_lang}, {context.subtitle_format})", context.get_subtitle_filepath(lang=context.subtitle_lang)),
+                    (f"Субтитры ({context.target_lang}, {context.subtitle_format})", context.get_subtitle_filepath(lang=context.target_lang)),
+                    ("Видео со смешанным аудио", context.get_merged_video_filepath()),
+                    ("Превью видео", context.thumbnail_path or _thumbnail_filepath(context)),
+                ]
+
+                # Одно чтение директории вместо отдельного stat() на каждый файл
+                existing = context.existing_outputs()
+                for label, path in reports:
+                    if path in existing:
+                        self.logger(f"[INFO] {label}: {path}")
             else:
                  self.logger("[WARN] Базовое имя файла не было определено, невозможно перечислить ожидаемые выходные файлы.")
             self.logger("[INFO] ---------------------------------------")
         else:
             self.logger("❌ Обработка остановлена из-за ошибки. Пожалуйста, проверьте логи выше.")
 
-        return success
\ No newline at end of file
+        return success
+
+    def perform_actions_batch(self, urls: List[str], yandex_audio: Optional[str], actions: List[str], output_dir: str,
+                              settings: Dict[str, Any], max_workers: Optional[int] = None) -> Dict[str, bool]:
+        """
+        Выполняет perform_actions для нескольких URL параллельно в дочерних процессах.
+
+        Args:
+            urls: Список URL видео.
+            yandex_audio, actions, output_dir, settings: Как в perform_actions, общие для всех URL.
+            max_workers: Число процессов (по умолчанию min(cpu_count, BATCH_MAX_WORKERS_DEFAULT)).
+
+        Returns:
+            Словарь {url: True/False} с результатом обработки каждого URL.
+        """
+        if not urls:
+            return {}
+        workers = max_workers or min(os.cpu_count() or 1, constants.BATCH_MAX_WORKERS_DEFAULT)
+        workers = max(1, min(workers, len(urls)))
+        self.logger(f"[INFO] Пакетная обработка {len(urls)} URL в {workers} процессах.")
+
+        # Дочерние процессы не могут вызвать self.logger напрямую: сообщения передаются через очередь
+        log_queue: multiprocessing.Queue = multiprocessing.Queue()
+
+        def relay_logs() -> None:
+            while (msg := log_queue.get()) is not None:
+                self.logger(msg)
+
+        relay = threading.Thread(target=relay_logs, daemon=True)
+        relay.start()
+
+        results: Dict[str, bool] = {}
+        jobs = [(url, yandex_audio, actions, output_dir, settings) for url in urls]
+        try:
+            with multiprocessing.Pool(processes=workers, initializer=_init_batch_worker, initargs=(log_queue,)) as pool:
+                for url, ok in pool.imap_unordered(_perform_actions_worker, jobs):
+                    results[url] = ok
+        finally:
+            log_queue.put(None)
+            relay.join()
+
+        failed = [url for url, ok in results.items() if not ok]
+        self.logger(f"[INFO] Пакетная обработка завершена: успешно {len(results) - len(failed)}, с ошибками {len(failed)}.")
+        for url in failed:
+            self.logger(f"[WARN] Обработка не удалась: {url}")
+        return results
+
+
+# Очередь логов дочернего процесса пакетной обработки (задаётся в _init_batch_worker)
+_batch_log_queue: Optional[multiprocessing.Queue] = None
+
+
+def _init_batch_worker(log_queue: multiprocessing.Queue) -> None:
+    """Инициализатор процесса пула: сохраняет очередь для пересылки логов родителю."""
+    global _batch_log_queue
+    _batch_log_queue = log_queue
+
+
+def _perform_actions_worker(job: Tuple[str, Optional[str], List[str], str, Dict[str, Any]]) -> Tuple[str, bool]:
+    """Обрабатывает один URL в дочернем процессе. Должна быть на уровне модуля для pickle."""
+    url, yandex_audio, actions, output_dir, settings = job
+    service = VideoService(_batch_log_queue.put)
+    try:
+        ok = service.perform_actions(url, yandex_audio, actions, output_dir, settings)
+    except Exception as e:
+        _batch_log_queue.put(f"[ERROR] Необработанная ошибка при обработке {url}: {type(e).__name__} - {e}")
+        ok = False
+    return url, ok
@@ -0,0 +1,27 @@
+import json
+import subprocess
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+def probe_media(path: Path | str, ffprobe_path: Path | str) -> Dict[str, Any]:
+    """
+    Возвращает описание медиафайла от ffprobe (секции format и streams).
+    Вызывает subprocess.CalledProcessError, если ffprobe не смог прочитать файл.
+    """
+    cmd = [str(ffprobe_path), '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', str(path)]
+    result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', errors='replace', check=True)
+    return json.loads(result.stdout or '{}')
+
+
+def has_stream(info: Dict[str, Any], codec_type: str) -> bool:
+    """Есть ли в описании ffprobe поток указанного типа ('audio', 'video')."""
+    return any(stream.get('codec_type') == codec_type for stream in info.get('streams', []))
+
+
+def duration_s(info: Dict[str, Any]) -> Optional[float]:
+    """Длительность из секции format в секундах или None, если она неизвестна."""
+    try:
+        return float(info['format']['duration'])
+    except (KeyError, TypeError, ValueError):
+        return None
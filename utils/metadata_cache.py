@@ -0,0 +1,53 @@
+import gzip
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import constants
+
+
+def _cache_path(url: str) -> Path:
+    digest = hashlib.sha1(url.encode('utf-8')).hexdigest()
+    return Path(constants.METADATA_CACHE_DIR) / f"{digest}.json.gz"
+
+
+def get(url: str, max_age_s: float = constants.METADATA_CACHE_MAX_AGE_S) -> Optional[Dict[str, Any]]:
+    """
+    Возвращает закешированные метаданные для URL или None,
+    если записи нет, она старше max_age_s секунд или повреждена.
+    """
+    path = _cache_path(url)
+    try:
+        if time.time() - path.stat().st_mtime > max_age_s:
+            return None
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def put(url: str, info: Dict[str, Any]) -> None:
+    """
+    Сохраняет метаданные для URL. Время изменения файла служит меткой свежести.
+    Вызывает OSError при ошибке записи.
+    """
+    path = _cache_path(url)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+        json.dump(info, f, ensure_ascii=False)
+    tmp.replace(path)
+
+
+def clear_metadata_cache() -> int:
+    """Удаляет все записи кеша метаданных. Возвращает число удалённых файлов."""
+    removed = 0
+    for path in Path(constants.METADATA_CACHE_DIR).glob("*.json.gz"):
+        try:
+            path.unlink()
+            removed += 1
+        except OSError:
+            pass
+    return removed
@@ -1,8 +1,18 @@
+import functools
 import os
 from pathlib import Path
 import shutil
-from typing import Optional
+from typing import Dict, Optional, Tuple
 import re
+import constants
+
+# Формат времени HH:MM:SS или HH:MM:SS.ms
+_TIME_RE = re.compile(r"^\d{2}:\d{2}:\d{2}(?:\.\d{1,3})?$")
+# Замена разделителей времени для имени файла: 00:01:00.5 -> 00-01-00-5
+_TIME_TRANS = str.maketrans({':': '-', '.': '-'})
+# Найденные исполняемые файлы: (имя, настроенный путь) -> Path. Неудачные поиски не запоминаются,
+# чтобы инструмент, установленный после запуска GUI, нашёлся при следующей проверке
+_found_executables: Dict[Tuple[str, Optional[str]], Path] = {}
 
 
 def ensure_dir(path: Path | str) -> None:
@@ -13,17 +23,31 @@ def ensure_dir(path: Path | str) -> None:
     """
     p = Path(path)
     try:
-        p.mkdir(parents=True, exist_ok=True)
+        # Без предварительной проверки существования: mkdir сам сообщает, что директория уже есть
+        p.mkdir(parents=True)
         print(f"[INFO] Создана директория: {p}")
+    except FileExistsError:
+        if not p.is_dir():
+            print(f"[ERROR] Путь существует и не является директорией: {p}")
+            raise
     except OSError as e:
         print(f"[ERROR] Не удалось создать директорию {p}: {e}")
         raise
 
 
+def tool_path_const_name(tool_name: str) -> str:
+    """
+    Возвращает имя константы в constants.py с путём к инструменту.
+    Пример: 'yt-dlp' -> 'YTDLP_PATH', 'ffmpeg' -> 'FFMPEG_PATH'.
+    """
+    return f"{tool_name.upper().replace('-', '')}_PATH"
+
+
 def find_executable(name: str, configured_path: Optional[str]) -> Optional[Path]:
     """
     Находит путь к исполняемому файлу для данного инструмента.
     Сначала проверяет настроенный путь, затем ищет в системном PATH.
+    Найденный путь кешируется на время работы процесса (сброс: reset_tool_cache), отсутствие — нет.
 
     Args:
         name: Имя исполняемого файла (например, 'ffmpeg', 'yt-dlp').
@@ -32,22 +56,29 @@ def find_executable(name: str, configured_path: Optional[str]) -> Optional[Path]
     Returns:
         Path к исполняемому файлу, если он найден и исполняем, иначе None.
     """
-    from shutil import which
-
+    key = (name, configured_path)
+    found = _found_executables.get(key)
+    if found is not None:
+        return found
     if configured_path:
         cfg = Path(configured_path)
         if cfg.is_file() and os.access(cfg, os.X_OK):
-            return cfg
-    system_path = which(name)
-    return Path(system_path) if system_path else None
+            found = cfg
+    if found is None:
+        system_path = shutil.which(name)
+        found = Path(system_path) if system_path else None
+    if found is not None:
+        _found_executables[key] = found
+    return found
 
 
+@functools.lru_cache(maxsize=64)
 def get_tool_path(tool_name: str) -> Path:
     """
     Возвращает Path к инструменту или бросает FileNotFoundError.
+    Найденный путь кешируется на время работы процесса (сброс: reset_tool_cache).
     """
-    import constants
-    path_const = getattr(constants, f"{tool_name.upper()}_PATH", None)
+    path_const = getattr(constants, tool_path_const_name(tool_name), None)
     candidate = find_executable(tool_name, path_const)
     if candidate and candidate.exists():
         return candidate
@@ -57,12 +88,33 @@ def get_tool_path(tool_name: str) -> Path:
     )
 
 
+def reset_tool_cache() -> None:
+    """Сбрасывает кеш find_executable/get_tool_path (например, после установки инструмента)."""
+    _found_executables.clear()
+    get_tool_path.cache_clear()
+
+
+def find_file_by_prefix(prefix: str, extension: str, directory: Path | str) -> Optional[Path]:
+    """
+    Возвращает первый файл в директории, имя которого начинается с prefix и заканчивается на extension.
+    Перебор останавливается на первом совпадении; отсутствующая директория даёт None.
+    """
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                name = entry.name
+                if name.startswith(prefix) and name.endswith(extension) and entry.is_file():
+                    return Path(directory) / name
+    except FileNotFoundError:
+        pass
+    return None
+
+
 def is_valid_time_format(time_str: str) -> bool:
     """
     Проверяет формат HH:MM:SS или HH:MM:SS.ms.
     """
-    pattern = re.compile(r"^\d{2}:\d{2}:\d{2}(\.\d{1,3})?$")
-    return bool(pattern.match(time_str))
+    return _TIME_RE.match(time_str) is not None
 
 
 def generate_trimmed_filename(input_path: Path | str, start_time: str, end_time: str) -> str:
@@ -70,9 +122,5 @@ def generate_trimmed_filename(input_path: Path | str, start_time: str, end_time:
     Генерирует имя выходного файла для обрезанного медиа.
     Пример: input.mp4 -> input_trimmed_00-01-00_00-05-30.mp4
     """
-    p = Path(input_path)
-    base = p.stem
-    ext = p.suffix
-    start_clean = start_time.replace(':', '-').replace('.', '-')
-    end_clean = end_time.replace(':', '-').replace('.', '-')
-    return f"{base}_trimmed_{start_clean}_{end_clean}{ext}"
+    base, ext = os.path.splitext(os.path.basename(os.fspath(input_path)))
+    return f"{base}_trimmed_{start_time.translate(_TIME_TRANS)}_{end_time.translate(_TIME_TRANS)}{ext}"
@@ -4,73 +4,243 @@ import subprocess
 import threading
 import traceback
 import queue
+import re
+from functools import partial
+import time
 from pathlib import Path
-from typing import List, Callable, Any, Optional, Dict
+from collections import deque
+from typing import List, Callable, Any, Optional, Dict, Deque, NamedTuple
 
 from model.video_service import VideoService
 from commands.trim_media import TrimMedia
+from utils.utils import find_executable, tool_path_const_name
+import constants
+
+class VMMessage(NamedTuple):
+    """
+    Сообщение ViewModel для GUI. Кортеж вместо словаря: меньше памяти и доступ по индексу.
+    type: 'log', 'status', 'tools', 'validation_error' или 'queue_update' (уведомление слушателей).
+    """
+    type: str
+    level: str
+    data: Any
+    origin: str
+    # Для 'status' завершённой задачи: сколько DEBUG-сообщений ViewModel отбросил за задачу
+    hidden_debug: int = 0
 
 # Тип для слушателей (GUI)
-ViewModelListener = Callable[[Dict[str, Any]], None]
+ViewModelListener = Callable[[VMMessage], None]
 
 class VideoViewModel:
     """
     ViewModel, связывающий GUI и модели обработки (VideoService, TrimMedia).
     Управляет потоками, очередью сообщений и уведомляет GUI.
     """
+    # Уровень лога по префиксу сообщения (префиксы в коде пишутся в верхнем регистре, сравнение точное)
+    LOG_LEVEL_PREFIXES = (
+        ("[ERROR]", "ERROR"),
+        ("❌", "ERROR"),
+        ("✖", "ERROR"),
+        ("[WARN]", "WARN"),
+        ("[DEBUG]", "DEBUG"),
+        ("[TRIM]", "TRIM"),
+    )
+    # Закрывающая ']' тега ищется только в начале сообщения такой длины
+    _LOG_PREFIX_MAX_LEN = max(len(prefix) for prefix, _ in LOG_LEVEL_PREFIXES)
+    # Префиксы — либо тег в скобках ("[...]"), либо один символ: уровень ищется по словарю, без перебора
+    _LOG_LEVEL_BY_PREFIX = dict(LOG_LEVEL_PREFIXES)
+    # Уровни, строки которых не отбрасываются при переполнении очереди
+    UNDROPPABLE_LOG_LEVELS = frozenset(("WARN", "ERROR"))
+    # Строки прогресса ffmpeg в stderr (frame=... / size=... time=...).
+    # Прогресс yt-dlp идёт в stdout, который run_tool не читает, поэтому здесь не встречается
+    PROGRESS_RE = re.compile(r"\bframe=\s*\d+|\bsize=\s*\S+\s+time=")
+
+    # Уведомление слушателей о новых сообщениях в очереди; один объект на все вызовы, слушатели его не изменяют
+    _QUEUE_UPDATE_MSG = VMMessage("queue_update", "INFO", None, "app")
+
+    # Внешние утилиты, проверяемые при запуске GUI: (имя исполняемого файла, отображаемое имя)
+    EXTERNAL_TOOLS = (('yt-dlp', 'yt-dlp'), ('ffmpeg', 'FFmpeg'))
+
     def __init__(self):
-        # Очередь сообщений для логов и статусов
-        self.message_queue: queue.Queue = queue.Queue()
-        self.listeners: List[ViewModelListener] = []
+        # Очередь сообщений для логов и статусов; GUI забирает её пачками.
+        # append/popleft у deque атомарны в CPython: один потребитель (GUI) не требует отдельной блокировки
+        self.message_queue: Deque[VMMessage] = deque()
+        # Устанавливается при каждом новом сообщении, сбрасывается в drain_queue.
+        # GUI проверяет его из главного потока: Tk не вызывается из рабочих потоков.
+        self.message_event = threading.Event()
+        # Прореживание строк прогресса: время последней пропущенной в очередь строки и последняя отброшенная
+        self._log_lock = threading.Lock()
+        self._last_progress_time = 0.0
+        self._pending_progress: Optional[tuple] = None
+        # Строки лога, отброшенные из-за переполнения очереди (под _log_lock)
+        self._dropped_log_count = 0
+        # Выводятся ли DEBUG-сообщения; при False они отбрасываются до постановки в очередь
+        # и только подсчитываются за текущую задачу (под _log_lock)
+        self.debug_enabled: bool = False
+        self._hidden_debug_count = 0
+        # Первый слушатель вызывается напрямую, без обхода списка; остальные (редкий случай) — из списка
+        self._listener: Optional[ViewModelListener] = None
+        self._extra_listeners: List[ViewModelListener] = []
 
         # Сервис для обработки URL и команда обрезки
         self.service = VideoService(self._log_message_to_queue)
         self.trimmer = TrimMedia(self._log_message_to_queue)
 
-        # Флаги состояния и ссылки на потоки
+        # Флаги состояния
         self._is_url_processing: bool = False
-        self._url_thread: Optional[threading.Thread] = None
         self._is_trimming: bool = False
-        self._trim_thread: Optional[threading.Thread] = None
+        # Задачи URL-обработки и обрезки выполняются по очереди в одном постоянном потоке,
+        # который создаётся при первом запуске задачи
+        self._jobs: queue.SimpleQueue = queue.SimpleQueue()
+        self._worker: Optional[threading.Thread] = None
+
+    # Список дополнительных слушателей заменяется целиком при изменении (copy-on-write), поэтому
+    # рабочие потоки обходят его в _notify_listeners без копирования
 
     def add_listener(self, listener: ViewModelListener) -> None:
-        if listener not in self.listeners:
-            self.listeners.append(listener)
+        if listener == self._listener or listener in self._extra_listeners:
+            return
+        if self._listener is None:
+            self._listener = listener
+        else:
+            self._extra_listeners = [*self._extra_listeners, listener]
 
     def remove_listener(self, listener: ViewModelListener) -> None:
-        if listener in self.listeners:
-            self.listeners.remove(listener)
+        if listener == self._listener:
+            # Место прямого слушателя занимает первый дополнительный
+            extra = self._extra_listeners
+            self._listener, self._extra_listeners = (extra[0], extra[1:]) if extra else (None, [])
+        elif listener in self._extra_listeners:
+            self._extra_listeners = [l for l in self._extra_listeners if l != listener]
 
-    def _notify_listeners(self, msg: Dict[str, Any]) -> None:
-        for listener in list(self.listeners):
+    def _notify_listeners(self, msg: VMMessage) -> None:
+        # Основной слушатель вызывается без try/except: его ошибка не скрывается
+        listener = self._listener
+        if listener is not None:
+            listener(msg)
+        for extra in self._extra_listeners:
             try:
-                listener(msg)
+                extra(msg)
             except Exception:
                 pass
 
+    def set_debug(self, enabled: bool) -> None:
+        """Включает или отключает передачу DEBUG-сообщений в GUI, в том числе для уже запущенной задачи."""
+        self.debug_enabled = enabled
+
+    def _post(self, msg: VMMessage) -> None:
+        """
+        Кладёт сообщение в очередь и отмечает его появление.
+        Слушатели уведомляются только о первом сообщении после разбора очереди, а не о каждом.
+        """
+        self.message_queue.append(msg)
+        # Проверка после добавления: если GUI сбросил событие до чтения, сообщение всё равно попадёт в его пачку
+        if not self.message_event.is_set():
+            self.message_event.set()
+            self._notify_listeners(self._QUEUE_UPDATE_MSG)
+
     def _log_message_to_queue(self, msg: str, origin: str = "url") -> None:
-        # Определяем уровень по префиксам
-        level = "INFO"
-        m = msg.lower()
-        if m.startswith("[error]") or m.startswith("❌"):
-            level = "ERROR"
-        elif m.startswith("[warn]"):
-            level = "WARN"
-        elif m.startswith("[debug]"):
-            level = "DEBUG"
-        elif m.startswith("[trim]"):
-            level = "TRIM"
-
-        event = {"type": "log", "level": level, "data": msg, "origin": origin}
-        self.message_queue.put(event)
-        self._notify_listeners({"type": "queue_update"})
-
-    def get_message_from_queue(self) -> Optional[Dict[str, Any]]:
+        """
+        Ставит строку лога в очередь GUI. Строки прогресса пропускаются не чаще LOG_PROGRESS_INTERVAL_S;
+        последняя отброшенная строка прогресса выводится перед следующим обычным сообщением.
+        Уровень определяется первым: отключённые DEBUG-строки отбрасываются до поиска прогресса.
+        """
+        # Определяем уровень по префиксу: тег до первой ']' или первый символ сообщения
+        by_prefix = self._LOG_LEVEL_BY_PREFIX
+        level = by_prefix.get(msg[:msg.find(']', 0, self._LOG_PREFIX_MAX_LEN) + 1]) or by_prefix.get(msg[:1], "INFO")
+        if level == "DEBUG" and not self.debug_enabled:
+            with self._log_lock:
+                self._hidden_debug_count += 1
+            return
+
+        if self.PROGRESS_RE.search(msg):
+            now = time.monotonic()
+            with self._log_lock:
+                if now - self._last_progress_time < constants.LOG_PROGRESS_INTERVAL_S:
+                    self._pending_progress = (msg, origin, level)
+                    return
+                self._last_progress_time = now
+                self._pending_progress = None
+        elif self._pending_progress is not None:
+            with self._log_lock:
+                pending, self._pending_progress = self._pending_progress, None
+            if pending is not None:
+                self._enqueue_log(*pending)
+        self._enqueue_log(msg, origin, level)
+
+    def _enqueue_log(self, msg: str, origin: str, level: str) -> None:
+        # Очередь ограничена: пока GUI не успевает её разбирать, отбрасываются строки ниже WARN
+        if level not in self.UNDROPPABLE_LOG_LEVELS and len(self.message_queue) >= constants.MAX_QUEUED_LOG_MESSAGES:
+            with self._log_lock:
+                self._dropped_log_count += 1
+            return
+        self._report_dropped_logs(origin)
+        self._post(VMMessage("log", level, msg, origin))
+
+    def _report_dropped_logs(self, origin: str) -> None:
+        """Выводит в лог число строк, отброшенных при переполнении очереди, если такие были."""
+        if not self._dropped_log_count:
+            return
+        with self._log_lock:
+            dropped, self._dropped_log_count = self._dropped_log_count, 0
+        if dropped:
+            self._post(VMMessage("log", "WARN", f"[WARN] Лог не успевал отображаться, пропущено строк: {dropped}", origin))
+
+    def get_message_from_queue(self) -> Optional[VMMessage]:
         try:
-            return self.message_queue.get_nowait()
-        except queue.Empty:
+            return self.message_queue.popleft()
+        except IndexError:
             return None
 
+    def drain_queue(self, max_items: Optional[int] = None) -> List[VMMessage]:
+        """
+        Забирает накопившиеся в очереди сообщения за один вызов: все или не больше max_items.
+        Если лимит исчерпан, message_event остаётся установленным — в очереди могут быть ещё сообщения.
+        """
+        # Сброс до чтения: сообщение, пришедшее во время разбора, снова установит событие
+        self.message_event.clear()
+        messages: List[VMMessage] = []
+        get = self.message_queue.popleft
+        try:
+            if max_items is None:
+                while True:
+                    messages.append(get())
+            else:
+                for _ in range(max_items):
+                    messages.append(get())
+                self.message_event.set()
+        except IndexError:
+            pass
+        return messages
+
+    def _submit(self, job: Callable[[], None]) -> None:
+        """Ставит задачу в очередь рабочего потока, запуская его при первом вызове."""
+        self._jobs.put(job)
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._worker_loop, daemon=True)
+            self._worker.start()
+
+    def _worker_loop(self) -> None:
+        while True:
+            job = self._jobs.get()
+            try:
+                job()
+            except Exception as e:
+                # Задачи сами сообщают об ошибках; поток не должен завершаться из-за необработанной
+                self._log_message_to_queue(f"[ERROR] Необработанная ошибка фоновой задачи: {e}", origin="app")
+
+    def check_external_tools(self) -> None:
+        """
+        Проверяет наличие внешних утилит в фоновом потоке, чтобы поиск по PATH не задерживал GUI.
+        Результат приходит в очередь сообщением типа "tools" с data = [отсутствующие утилиты].
+        """
+        def probe():
+            missing = [display for tool, display in self.EXTERNAL_TOOLS
+                       if not find_executable(tool, getattr(constants, tool_path_const_name(tool), None))]
+            self._post(VMMessage("tools", "WARN" if missing else "INFO", missing, "app"))
+
+        threading.Thread(target=probe, daemon=True).start()
+
     def run(self,
             url: str,
             yandex_audio: Optional[str],
@@ -89,28 +259,36 @@ class VideoViewModel:
             return
 
         self._is_url_processing = True
+        self._hidden_debug_count = 0
+        # Снимок флага для команд: дорогие DEBUG-данные (traceback, дампы контекста) не формируются без нужды
+        settings = {**settings, 'debug': self.debug_enabled}
         # Сигнал GUI о старте
-        self.message_queue.put({"type": "status", "level": "INFO", "data": "running", "origin": "url"})
-        self._notify_listeners({"type": "queue_update"})
+        self._post(VMMessage("status", "INFO", "running", "url"))
 
-        def task():
-            success = False
-            try:
-                ya_path = Path(yandex_audio) if yandex_audio else None
-                out_dir = Path(output_dir)
-                success = self.service.perform_actions(url, ya_path, actions, out_dir, settings)
-            except Exception as e:
-                self._log_message_to_queue(f"[ERROR] Сервис завершился с ошибкой: {e}", origin="url")
-                self._log_message_to_queue(f"[DEBUG] Traceback:\n{traceback.format_exc()}", origin="url")
-            finally:
-                status = "finished" if success else "error"
-                level = "INFO" if success else "ERROR"
-                self.message_queue.put({"type": "status", "level": level, "data": status, "origin": "url"})
-                self._notify_listeners({"type": "queue_update"})
-                self._is_url_processing = False
+        self._submit(partial(self._url_task, url, yandex_audio, actions, output_dir, settings))
 
-        self._url_thread = threading.Thread(target=task, daemon=True)
-        self._url_thread.start()
+    def _url_task(self,
+                  url: str,
+                  yandex_audio: Optional[str],
+                  actions: List[str],
+                  output_dir: str,
+                  settings: Dict[str, Any]) -> None:
+        """Тело задачи URL-обработки; выполняется в рабочем потоке."""
+        success = False
+        try:
+            ya_path = Path(yandex_audio) if yandex_audio else None
+            out_dir = Path(output_dir)
+            success = self.service.perform_actions(url, ya_path, actions, out_dir, settings)
+        except Exception as e:
+            self._log_message_to_queue(f"[ERROR] Сервис завершился с ошибкой: {e}", origin="url")
+            if self.debug_enabled:
+                self._log_message_to_queue(f"[DEBUG] Traceback:\n{traceback.format_exc()}", origin="url")
+        finally:
+            status = "finished" if success else "error"
+            level = "INFO" if success else "ERROR"
+            self._report_dropped_logs("url")
+            self._post(VMMessage("status", level, status, "url", self._hidden_debug_count))
+            self._is_url_processing = False
 
     def run_trim(self,
                  input_path: str,
@@ -118,7 +296,7 @@ class VideoViewModel:
                  start_time: str,
                  end_time: str) -> None:
         """
-        Запускает задачу обрезки файла во фоновом потоке.
+        Запускает задачу обрезки файла в рабочем потоке ViewModel.
         Преобразует пути в pathlib.Path.
         """
         if self._is_trimming:
@@ -129,26 +307,30 @@ class VideoViewModel:
             return
 
         self._is_trimming = True
-        self.message_queue.put({"type": "status", "level": "INFO", "data": "running", "origin": "trim"})
-        self._notify_listeners({"type": "queue_update"})
+        self._hidden_debug_count = 0
+        self._post(VMMessage("status", "INFO", "running", "trim"))
 
-        def trim_task():
-            success = False
-            try:
-                in_path = Path(input_path)
-                out_path = Path(output_path)
-                self.trimmer.execute(in_path, out_path, start_time, end_time)
-                success = True
-            except Exception as e:
-                self._log_message_to_queue(f"[ERROR] Обрезка завершилась с ошибкой: {e}", origin="trim")
-                if not isinstance(e, (FileNotFoundError, ValueError, subprocess.CalledProcessError)):
-                    self._log_message_to_queue(f"[DEBUG] Traceback:\n{traceback.format_exc()}", origin="trim")
-            finally:
-                status = "finished" if success else "error"
-                level = "INFO" if success else "ERROR"
-                self.message_queue.put({"type": "status", "level": level, "data": status, "origin": "trim"})
-                self._notify_listeners({"type": "queue_update"})
-                self._is_trimming = False
-
-        self._trim_thread = threading.Thread(target=trim_task, daemon=True)
-        self._trim_thread.start()
+        self._submit(partial(self._trim_task, input_path, output_path, start_time, end_time))
+
+    def _trim_task(self, input_path: str, output_path: str, start_time: str, end_time: str) -> None:
+        """Тело задачи обрезки; выполняется в рабочем потоке."""
+        success = False
+        try:
+            in_path = Path(input_path)
+            out_path = Path(output_path)
+            # Проверка файловой системы выполняется здесь, а не в GUI: сетевой диск может отвечать долго
+            if not in_path.is_file():
+                self._post(VMMessage("validation_error", "ERROR", ['Неверный входной файл'], "trim"))
+                return
+            self.trimmer.execute(in_path, out_path, start_time, end_time)
+            success = True
+        except Exception as e:
+            self._log_message_to_queue(f"[ERROR] Обрезка завершилась с ошибкой: {e}", origin="trim")
+            if self.debug_enabled and not isinstance(e, (FileNotFoundError, ValueError, subprocess.CalledProcessError)):
+                self._log_message_to_queue(f"[DEBUG] Traceback:\n{traceback.format_exc()}", origin="trim")
+        finally:
+            status = "finished" if success else "error"
+            level = "INFO" if success else "ERROR"
+            self._report_dropped_logs("trim")
+            self._post(VMMessage("status", level, status, "trim", self._hidden_debug_count))
+            self._is_trimming = False